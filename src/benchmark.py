@@ -0,0 +1,196 @@
+"""CSC110 final project, main module
+
+Descriptions
+===============================
+
+This module benchmarks our data loading and regression functions on the large
+synthetic datasets written by generate_data, recording the time, throughput and
+peak memory of each, and compares the results against a saved baseline so that
+slowdowns in the hot paths are caught.
+
+Copyright and Usage Information
+===============================
+
+All forms of distribution of this code, whether as given or with any changes, are
+expressly prohibited. All rights reserved.
+
+This file is Copyright (c) 2020 Runshi Yang, Chenxu Wang and Haojun Qiu
+"""
+import contextlib
+import io
+import json
+import time
+import tracemalloc
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, List
+import numpy as np
+import read_data
+import rendering
+import typed_csv
+from generate_data import generate_dataset
+from simple_regression import simple_linear_regression, calculate_r_squared
+from multiple_regression import fit_multiple_regression, multiple_linear_regression
+
+
+@dataclass
+class BenchmarkResult:
+    """The measured performance of one benchmarked function.
+
+    Instance Attributes:
+      - name: the name of the benchmark
+      - rows: the number of rows (or points) the function processed
+      - seconds: the best wall time of one call, over the repeated calls
+      - rows_per_second: the throughput of the best call
+      - peak_bytes: the peak memory allocated by one call
+
+    Representation Invariants:
+      - self.rows > 0
+      - self.seconds > 0
+    """
+    name: str
+    rows: int
+    seconds: float
+    rows_per_second: float
+    peak_bytes: int
+
+
+def measure(name: str, function: Callable[[], Any], rows: int,
+            repeats: int = 3) -> BenchmarkResult:
+    """Call function repeatedly, and return its best wall time and its peak memory.
+
+    Memory is traced in a separate call, so that tracing does not slow down the timed calls.
+
+    Preconditions:
+        - rows > 0 and repeats > 0
+    """
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        list.append(times, time.perf_counter() - start)
+
+    tracemalloc.start()
+    function()
+    peak_bytes = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    seconds = min(times)
+    return BenchmarkResult(name, rows, seconds, rows / seconds, peak_bytes)
+
+
+def count_rows(filepath: str) -> int:
+    """Return the number of data rows (not counting the header) in the given csv file."""
+    with open(filepath) as file:
+        return sum(1 for _ in file) - 1
+
+
+def run_benchmarks(directory: str = 'benchmark_data', years: int = 50, areas: int = 1000,
+                   points: int = 1_000_000, repeats: int = 3) -> List[BenchmarkResult]:
+    """Generate a synthetic dataset of the given size into directory, and benchmark our
+    read_data functions on it and our regression functions on the given number of points.
+    """
+    paths = generate_dataset(directory, years=years, areas=areas)
+    daily, monthly, disease = paths['daily_weather'], paths['monthly_weather'], paths['disease']
+    daily_rows, monthly_rows, disease_rows = count_rows(daily), count_rows(monthly), \
+        count_rows(disease)
+
+    benchmarks = [
+        ('extract_and_store_climate_data', lambda: read_data.extract_and_store_climate_data(daily),
+         daily_rows),
+        ('load_climate_table', lambda: read_data.load_climate_table(daily), daily_rows),
+        ('load_monthly_climate_table', lambda: read_data.load_monthly_climate_table(monthly),
+         monthly_rows),
+        ('load_weather_table', lambda: read_data.load_weather_table(daily), daily_rows),
+        ('extract_and_store_disease_data',
+         lambda: read_data.extract_and_store_disease_data(disease), disease_rows),
+        ('read_weekly_disease_data', lambda: read_data.read_weekly_disease_data(disease),
+         disease_rows),
+        ('load_disease_panel', lambda: read_data.load_disease_panel(disease), disease_rows),
+        ('typed read_weather_table', lambda: typed_csv.read_weather_table(daily), daily_rows),
+        ('typed read_disease_panel', lambda: typed_csv.read_disease_panel(disease),
+         disease_rows),
+        ('load_monthly_table', lambda: read_data.load_monthly_table(daily, disease),
+         daily_rows + disease_rows)
+    ]
+    results = [measure(name, function, rows, repeats) for name, function, rows in benchmarks]
+
+    # Regressions on random points with a linear trend
+    rng = np.random.default_rng(0)
+    x = rng.normal(55, 15, (points, 2))
+    y = x @ np.array([10.0, -100.0]) + rng.normal(0, 50, points)
+    pairs = list(zip(x[:, 0].tolist(), y.tolist()))
+    a, b = simple_linear_regression(pairs)
+    data = {'temperature': x[:, 0], 'precipitation': x[:, 1], 'disease': y}
+
+    def run_multiple_linear_regression() -> None:
+        with contextlib.redirect_stdout(io.StringIO()):
+            multiple_linear_regression(data, 50.0, 3.0)
+
+    previous_mode = rendering.render_mode
+    rendering.set_render_mode('off')
+    results.extend([
+        measure('simple_linear_regression', lambda: simple_linear_regression(pairs), points,
+                repeats),
+        measure('calculate_r_squared', lambda: calculate_r_squared(pairs, a, b), points,
+                repeats),
+        measure('fit_multiple_regression', lambda: fit_multiple_regression(x, y), points,
+                repeats),
+        measure('multiple_linear_regression', run_multiple_linear_regression, points, repeats)
+    ])
+    rendering.set_render_mode(previous_mode, rendering.output_dir)
+    return results
+
+
+def save_results(results: List[BenchmarkResult], filepath: str) -> None:
+    """Save the given benchmark results to filepath as JSON, to serve as a baseline."""
+    with open(filepath, 'w') as file:
+        json.dump([asdict(result) for result in results], file, indent=2)
+
+
+def compare_to_baseline(results: List[BenchmarkResult], filepath: str,
+                        tolerance: float = 0.25) -> Dict[str, str]:
+    """Return a description of every benchmark whose throughput dropped, or whose peak memory
+    grew, by more than the given fraction compared to the baseline saved at filepath.
+
+    >>> old = [BenchmarkResult('fit', 100, 1.0, 100.0, 1000)]
+    >>> save_results(old, 'baseline_doctest.json')
+    >>> compare_to_baseline([BenchmarkResult('fit', 100, 2.0, 50.0, 1000)],
+    ...                     'baseline_doctest.json')
+    {'fit': 'throughput 100.0 -> 50.0 rows/s'}
+    >>> import os; os.remove('baseline_doctest.json')
+    """
+    with open(filepath) as file:
+        baseline = {entry['name']: entry for entry in json.load(file)}
+
+    regressions_so_far = {}
+    for result in results:
+        if result.name not in baseline:
+            continue
+        old = baseline[result.name]
+        problems = []
+        if result.rows_per_second < old['rows_per_second'] * (1 - tolerance):
+            list.append(problems, 'throughput ' + str(round(old['rows_per_second'], 1)) + ' -> '
+                        + str(round(result.rows_per_second, 1)) + ' rows/s')
+        if result.peak_bytes > old['peak_bytes'] * (1 + tolerance):
+            list.append(problems, 'peak memory ' + str(old['peak_bytes']) + ' -> '
+                        + str(result.peak_bytes) + ' bytes')
+        if problems:
+            regressions_so_far[result.name] = ', '.join(problems)
+    return regressions_so_far
+
+
+if __name__ == '__main__':
+    import doctest
+
+    doctest.testmod(verbose=True)
+
+    import python_ta
+    python_ta.check_all(config={
+        'extra-imports': ['contextlib', 'io', 'json', 'time', 'tracemalloc', 'dataclasses',
+                          'typing', 'numpy', 'read_data', 'rendering', 'typed_csv',
+                          'generate_data', 'simple_regression', 'multiple_regression',
+                          'python_ta'],
+        'allowed-io': ['count_rows', 'save_results', 'compare_to_baseline'],
+        'max-line-length': 100,
+        'disable': ['R1705', 'C0200']
+    })
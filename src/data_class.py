@@ -16,7 +16,8 @@ This file is Copyright (c) 2020 Runshi Yang, Chenxu Wang and Haojun Qiu
 """
 
 from dataclasses import dataclass
-from typing import List
+from typing import Dict, List, Sequence
+import numpy as np
 
 
 @dataclass
@@ -55,6 +56,209 @@ class Climate:
     monthly_sum_precipitation: List[float]
 
 
+@dataclass
+class MonthlyStats:
+    """A custom datatype storing the running summary of the daily values in one month.
+
+    Instance Attributes:
+      - count: the number of daily values seen in this month
+      - total: the sum of the daily values seen in this month
+      - minimum: the smallest daily value seen in this month
+      - maximum: the largest daily value seen in this month
+
+    Representation Invariants:
+      - self.count >= 0
+      - self.count == 0 or self.minimum <= self.maximum
+
+    >>> stats = MonthlyStats()
+    >>> stats.add(3.0)
+    >>> stats.add(1.0)
+    >>> (stats.count, stats.total, stats.minimum, stats.maximum, stats.mean())
+    (2, 4.0, 1.0, 3.0, 2.0)
+    """
+    count: int = 0
+    total: float = 0.0
+    minimum: float = float('inf')
+    maximum: float = float('-inf')
+
+    def add(self, value: float) -> None:
+        """Fold one daily value into this month's summary."""
+        self.count += 1
+        self.total += value
+        if value < self.minimum:
+            self.minimum = value
+        if value > self.maximum:
+            self.maximum = value
+
+    def merge(self, other: 'MonthlyStats') -> None:
+        """Fold the summary of other daily values of the same month into this one.
+
+        >>> stats = MonthlyStats(2, 4.0, 1.0, 3.0)
+        >>> stats.merge(MonthlyStats(1, 5.0, 5.0, 5.0))
+        >>> (stats.count, stats.total, stats.minimum, stats.maximum)
+        (3, 9.0, 1.0, 5.0)
+        """
+        self.count += other.count
+        self.total += other.total
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+
+    def mean(self) -> float:
+        """Return the mean of the daily values seen in this month.
+
+        Preconditions:
+          - self.count > 0
+        """
+        return self.total / self.count
+
+
+def month_index(year: int, month: int) -> int:
+    """Return the number of months between January of year 0 and the given month, which
+    is the time index used by MonthlyTable.
+
+    >>> month_index(2016, 1) - month_index(2015, 12)
+    1
+    """
+    return year * 12 + month - 1
+
+
+class MonthlyTable:
+    """A compact, column-oriented table of monthly values backed by NumPy arrays.
+
+    Instance Attributes:
+      - months: the time index of each row, as given by month_index
+      - names: the name of each column
+      - values: a 2-D float array with one row per month and one column per name
+
+    Representation Invariants:
+      - self.values.shape == (len(self.months), len(self.names))
+      - all(self.months[i] < self.months[i + 1] for i in range(len(self.months) - 1))
+
+    >>> table = MonthlyTable([month_index(2016, 1), month_index(2016, 2)],
+    ...                      ['temperature'], [[30.0], [35.0]])
+    >>> table.column('temperature').tolist()
+    [30.0, 35.0]
+    """
+    __slots__ = ('months', 'names', 'values')
+    months: np.ndarray
+    names: tuple
+    values: np.ndarray
+
+    def __init__(self, months: Sequence[int], names: Sequence[str], values: Sequence) -> None:
+        self.months = np.asarray(months, dtype=np.int64)
+        self.names = tuple(names)
+        self.values = np.asarray(values, dtype=np.float64).reshape(len(self.months),
+                                                                   len(self.names))
+
+    def __len__(self) -> int:
+        return len(self.months)
+
+    def column(self, name: str) -> np.ndarray:
+        """Return a view of the column with the given name.
+
+        Preconditions:
+          - name in self.names
+        """
+        return self.values[:, self.names.index(name)]
+
+    def select(self, names: Sequence[str]) -> np.ndarray:
+        """Return a 2-D array holding the columns with the given names, in that order.
+
+        Preconditions:
+          - all(name in self.names for name in names)
+        """
+        return self.values[:, [self.names.index(name) for name in names]]
+
+    def as_dict(self) -> Dict[str, np.ndarray]:
+        """Return a dictionary mapping each column name to a view of that column,
+        in the order of self.names.
+        """
+        return {name: self.values[:, i] for i, name in enumerate(self.names)}
+
+    def join(self, other: 'MonthlyTable') -> 'MonthlyTable':
+        """Return a table holding the columns of self followed by the columns of other,
+        for the months present in both.
+
+        >>> climate = ClimateTable([1, 2, 3], ['temperature'], [[1.0], [2.0], [3.0]])
+        >>> disease = DiseaseTable([2, 3, 4], ['lyme'], [[20.0], [30.0], [40.0]])
+        >>> joined = climate.join(disease)
+        >>> joined.months.tolist(), joined.names
+        ([2, 3], ('temperature', 'lyme'))
+        """
+        months, self_rows, other_rows = np.intersect1d(self.months, other.months,
+                                                       assume_unique=True, return_indices=True)
+        values = np.hstack((self.values[self_rows], other.values[other_rows]))
+        return MonthlyTable(months, self.names + other.names, values)
+
+
+class ClimateTable(MonthlyTable):
+    """A MonthlyTable whose columns are climate variables of a region,
+    such as 'temperature' and 'precipitation'.
+    """
+    __slots__ = ()
+
+    @property
+    def variables(self) -> tuple:
+        """The names of the climate variables in this table."""
+        return self.names
+
+
+class DiseaseTable(MonthlyTable):
+    """A MonthlyTable whose columns are the monthly cases of diseases in a region,
+    such as 'lyme'.
+    """
+    __slots__ = ()
+
+    @property
+    def diseases(self) -> tuple:
+        """The names of the diseases in this table."""
+        return self.names
+
+
+class DiseasePanel:
+    """A panel of weekly disease cases indexed by reporting area, disease and MMWR week,
+    backed by a NumPy array.
+
+    Instance Attributes:
+      - areas: the name of each reporting area
+      - diseases: the name of each disease
+      - weeks: the (MMWR year, MMWR week) of each week, in calendar order
+      - cases: a 3-D float array, where cases[i, j, k] is the number of newly reported
+        cases of diseases[j] in areas[i] during weeks[k]
+
+    Representation Invariants:
+      - self.cases.shape == (len(self.areas), len(self.diseases), len(self.weeks))
+      - all(1 <= week[1] <= 53 for week in self.weeks)
+
+    >>> panel = DiseasePanel(['NEW YORK'], ['Lyme disease'], [(2016, 1), (2016, 2)],
+    ...                      [[[6.0, 7.0]]])
+    >>> panel.series('NEW YORK', 'Lyme disease').tolist()
+    [6.0, 7.0]
+    """
+    __slots__ = ('areas', 'diseases', 'weeks', 'cases')
+    areas: tuple
+    diseases: tuple
+    weeks: tuple
+    cases: np.ndarray
+
+    def __init__(self, areas: Sequence[str], diseases: Sequence[str],
+                 weeks: Sequence[tuple], cases: Sequence) -> None:
+        self.areas = tuple(areas)
+        self.diseases = tuple(diseases)
+        self.weeks = tuple(weeks)
+        self.cases = np.asarray(cases, dtype=np.float64).reshape(
+            len(self.areas), len(self.diseases), len(self.weeks))
+
+    def series(self, area: str, disease: str) -> np.ndarray:
+        """Return a view of the weekly cases of the given disease in the given area.
+
+        Preconditions:
+          - area in self.areas
+          - disease in self.diseases
+        """
+        return self.cases[self.areas.index(area), self.diseases.index(disease)]
+
+
 if __name__ == '__main__':
     import doctest
 
@@ -62,7 +266,7 @@ if __name__ == '__main__':
 
     import python_ta
     python_ta.check_all(config={
-        'extra-imports': ['dataclasses', 'python_ta'],
+        'extra-imports': ['dataclasses', 'typing', 'numpy', 'python_ta'],
         'allowed-io': [],
         'max-line-length': 100,
         'disable': ['R1705', 'C0200']
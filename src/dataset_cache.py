@@ -0,0 +1,149 @@
+"""CSC110 final project, main module
+
+Descriptions
+===============================
+
+This module contains a persistent, on-disk cache for parsed datasets, so that
+the csv files only need to be parsed again when they change.
+
+Each cached result is a dictionary of NumPy arrays stored in a binary .npz file,
+named by a fingerprint of the source file's path, modification time and size.
+Changing the source file therefore changes its fingerprint, and the stale entry is
+simply never read again; it is removed once the cache grows past its size bound,
+least recently used first. The memory-mapped weather stores of weather_store are kept
+in the same directory, and are evicted along with the other entries.
+
+Copyright and Usage Information
+===============================
+
+All forms of distribution of this code, whether as given or with any changes, are
+expressly prohibited. All rights reserved.
+
+This file is Copyright (c) 2020 Runshi Yang, Chenxu Wang and Haojun Qiu
+"""
+import hashlib
+import os
+import tempfile
+from typing import Callable, Dict, Optional
+import numpy as np
+
+# The directory where cached datasets are stored
+CACHE_DIR = '.dataset_cache'
+
+# The maximum total size of the cached datasets, in bytes
+MAX_CACHE_BYTES = 64 * 1024 * 1024
+
+# Bump this whenever the layout of the cached arrays changes
+CACHE_VERSION = 2
+
+
+def fingerprint(filepath: str, kind: str) -> str:
+    """Return a fingerprint of the given source file, for the parsed result named kind.
+
+    The fingerprint changes whenever the file is moved, modified or resized.
+
+    Preconditions:
+        - filepath refers to an existing file
+    """
+    stat = os.stat(filepath)
+    key = '|'.join([str(CACHE_VERSION), kind, os.path.abspath(filepath),
+                    str(stat.st_mtime_ns), str(stat.st_size)])
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def load_or_compute(filepath: str, kind: str, compute: Callable[[], Dict[str, np.ndarray]],
+                    cache_dir: str = CACHE_DIR,
+                    max_bytes: int = MAX_CACHE_BYTES) -> Dict[str, np.ndarray]:
+    """Return the arrays parsed from filepath, reading them from the cache if present, or
+    else calling compute and storing its result in the cache.
+
+    kind names what compute parses out of the file, so that different results parsed from
+    the same file are cached separately.
+
+    Preconditions:
+        - filepath refers to an existing file
+        - max_bytes >= 0
+    """
+    cache_path = os.path.join(cache_dir, fingerprint(filepath, kind) + '.npz')
+
+    try:
+        with np.load(cache_path) as cached:
+            arrays = {name: cached[name] for name in cached.files}
+        # Mark this entry as recently used
+        os.utime(cache_path)
+        return arrays
+    except FileNotFoundError:
+        # Not cached yet, or evicted by another process while it was being read
+        pass
+
+    arrays = compute()
+
+    # Each writer gets its own temporary file, so concurrent writers of the same entry
+    # never interleave, and whichever finishes last replaces the entry whole
+    os.makedirs(cache_dir, exist_ok=True)
+    handle, temp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+    try:
+        with os.fdopen(handle, 'wb') as file:
+            np.savez(file, **arrays)
+        os.replace(temp_path, cache_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    evict(cache_dir, max_bytes)
+    return arrays
+
+
+def evict(cache_dir: str = CACHE_DIR, max_bytes: int = MAX_CACHE_BYTES,
+          keep: Optional[str] = None) -> None:
+    """Remove the least recently used entries of the cache until its total size
+    is at most max_bytes, never removing the entry at the path keep (such as an entry
+    that was just written and is about to be read).
+
+    Entries that another process evicts at the same time are skipped.
+    """
+    if not os.path.isdir(cache_dir):
+        return
+
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.endswith(('.npz', '.wx')):
+            try:
+                stat = os.stat(os.path.join(cache_dir, name))
+            except FileNotFoundError:
+                continue
+            list.append(entries, (stat.st_mtime_ns, stat.st_size, name))
+
+    total_size = sum(entry[1] for entry in entries)
+    kept = None if keep is None else os.path.basename(keep)
+    for _, size, name in sorted(entries):
+        if total_size <= max_bytes:
+            break
+        if name == kept:
+            continue
+        try:
+            os.remove(os.path.join(cache_dir, name))
+        except FileNotFoundError:
+            # Already evicted by another process, which freed its bytes all the same
+            pass
+        total_size -= size
+
+
+def clear(cache_dir: str = CACHE_DIR) -> None:
+    """Remove every entry of the cache."""
+    evict(cache_dir, 0)
+
+
+if __name__ == '__main__':
+    import doctest
+
+    doctest.testmod(verbose=True)
+
+    import python_ta
+    python_ta.check_all(config={
+        'extra-imports': ['hashlib', 'os', 'tempfile', 'typing', 'numpy', 'python_ta'],
+        'allowed-io': ['load_or_compute'],
+        'max-line-length': 100,
+        'disable': ['R1705', 'C0200']
+    })
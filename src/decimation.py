@@ -0,0 +1,97 @@
+"""CSC110 final project, main module
+
+Descriptions
+===============================
+
+This module reduces large point clouds before they are plotted, so that diagnostic plots
+of full sweeps (hundreds of thousands of region-months) draw in seconds and write small
+files.
+
+Points are thinned on a grid: the bounding box of the points is split into equal cells,
+and only the first point of each occupied cell is kept. Unlike a random sample, this keeps
+every outlier and the overall shape of the cloud. Dense regions are shown instead by the
+counts of points binned on a 2-D grid, drawn as a density heatmap.
+
+Copyright and Usage Information
+===============================
+
+All forms of distribution of this code, whether as given or with any changes, are
+expressly prohibited. All rights reserved.
+
+This file is Copyright (c) 2020 Runshi Yang, Chenxu Wang and Haojun Qiu
+"""
+from typing import Tuple
+import numpy as np
+
+# Plots with more points than this use WebGL traces instead of SVG
+WEBGL_THRESHOLD = 1000
+
+# The largest number of raw points drawn in one plot; larger clouds are thinned and binned
+MAX_PLOT_POINTS = 5000
+
+# The number of bins along each axis of a density heatmap
+DENSITY_BINS = 100
+
+
+def thin_points(points: np.ndarray, max_points: int = MAX_PLOT_POINTS) -> np.ndarray:
+    """Return the indices, in increasing order, of at most max_points of the given points
+    (one per row) that cover the same region as all of them.
+
+    The bounding box of the points is split into a grid of at most max_points equal
+    cells, and the first point of each occupied cell is kept.
+
+    Preconditions:
+        - points.ndim == 2
+        - max_points >= 1
+
+    >>> points = np.array([[0.0, 0.0], [0.1, 0.1], [10.0, 10.0], [0.2, 0.0], [9.0, 1.0]])
+    >>> thin_points(points, 5).tolist()
+    [0, 1, 2, 3, 4]
+    >>> thin_points(points, 4).tolist()
+    [0, 2, 4]
+    """
+    n, dimensions = points.shape
+    if n <= max_points:
+        return np.arange(n)
+
+    # The largest number of cells along each axis, with at most max_points cells in total
+    cells = max(1, int(round(max_points ** (1 / dimensions), 9)))
+
+    low = np.min(points, axis=0)
+    span = np.max(points, axis=0) - low
+    span[span == 0] = 1.0
+    grid = np.minimum((points - low) / span * cells, cells - 1).astype(np.int64)
+
+    _, first = np.unique(np.ravel_multi_index(tuple(grid.T), (cells,) * dimensions),
+                         return_index=True)
+    return np.sort(first)
+
+
+def density(x: np.ndarray, y: np.ndarray,
+            bins: int = DENSITY_BINS) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Return the centres of the x bins, the centres of the y bins, and the number of
+    points in each bin (with one row per y bin, as plotly heatmaps expect). Empty bins
+    are NaN, so they are left blank.
+
+    >>> centres_x, centres_y, counts = density(np.array([0.0, 0.0, 1.0]),
+    ...                                        np.array([0.0, 0.0, 1.0]), 2)
+    >>> centres_x.tolist(), counts.tolist()
+    ([0.25, 0.75], [[2.0, nan], [nan, 1.0]])
+    """
+    counts, edges_x, edges_y = np.histogram2d(x, y, bins=bins)
+    counts[counts == 0] = np.nan
+    return ((edges_x[:-1] + edges_x[1:]) / 2, (edges_y[:-1] + edges_y[1:]) / 2, counts.T)
+
+
+if __name__ == '__main__':
+    import doctest
+
+    doctest.testmod(verbose=True)
+
+    import python_ta
+    python_ta.check_all(config={
+        'extra-imports': ['typing', 'numpy', 'python_ta'],
+        'allowed-io': [],
+        'max-line-length': 100,
+        'disable': ['R1705', 'C0200']
+    })
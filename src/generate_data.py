@@ -0,0 +1,161 @@
+"""CSC110 final project, main module
+
+Descriptions
+===============================
+
+This module generates synthetic weather and disease datasets in the same formats as
+the files in datasets/, but at a much larger scale (decades of daily rows, thousands of
+reporting areas), so that our data loading and regression functions can be benchmarked.
+
+The values follow a seasonal pattern with random noise, and lyme cases follow the
+temperature, so the generated data can also be fitted meaningfully.
+
+Copyright and Usage Information
+===============================
+
+All forms of distribution of this code, whether as given or with any changes, are
+expressly prohibited. All rights reserved.
+
+This file is Copyright (c) 2020 Runshi Yang, Chenxu Wang and Haojun Qiu
+"""
+import csv
+import datetime
+import os
+from typing import Dict
+import numpy as np
+from mmwr_calendar import weeks_in_year, week_start
+
+DAILY_WEATHER_HEADER = ['date', 'maximum temperature', 'minimum temperature',
+                        'average temperature', 'precipitation', 'snow fall', 'snow depth']
+MONTHLY_WEATHER_HEADER = ['Date', 'mean temperature', 'precipitation']
+DISEASE_HEADER = ['Reporting Area', 'MMWR Year', 'MMWR Week', 'Lyme disease, Current week',
+                  'Malaria, Current week']
+
+
+def seasonal_temperature(day_of_year: np.ndarray) -> np.ndarray:
+    """Return the typical mean temperature (in Fahrenheit) on the given days of the year,
+    peaking in late July.
+
+    >>> seasonal_temperature(np.array([15, 200])).round(1).tolist()
+    [32.1, 78.0]
+    """
+    return 55 - 23 * np.cos(2 * np.pi * (day_of_year - 20) / 365.25)
+
+
+def write_daily_weather(filepath: str, start_year: int, years: int, seed: int = 0) -> int:
+    """Write daily weather rows for the given years to filepath, in the format of
+    datasets/weather_2016.csv, and return the number of rows written.
+
+    Preconditions:
+        - years > 0
+    """
+    rng = np.random.default_rng(seed)
+    first = datetime.date(start_year, 1, 1)
+    days = (datetime.date(start_year + years, 1, 1) - first).days
+    dates = [first + datetime.timedelta(days=i) for i in range(days)]
+
+    average = seasonal_temperature(np.array([d.timetuple().tm_yday for d in dates]))
+    average = np.round(average + rng.normal(0, 6, days)).astype(int)
+    spread = rng.integers(4, 12, days)
+
+    # About 1 day in 10 has only a trace of precipitation, and most days are dry
+    precipitation = np.round(rng.exponential(0.35, days) * (rng.random(days) < 0.35), 2)
+    trace = rng.random(days) < 0.1
+    snow_fall = np.where(average < 33, np.round(precipitation * 10, 1), 0.0)
+    snow_depth = np.round(np.maximum(0.0, 40 - average) * (average < 33) / 4)
+
+    with open(filepath, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(DAILY_WEATHER_HEADER)
+        for i, date in enumerate(dates):
+            writer.writerow([str(date.day) + '-' + str(date.month) + '-' + str(date.year),
+                             average[i] + spread[i], average[i] - spread[i], average[i],
+                             'T' if trace[i] else precipitation[i],
+                             'T' if trace[i] and average[i] < 33 else snow_fall[i],
+                             snow_depth[i]])
+    return days
+
+
+def write_monthly_weather(filepath: str, start_year: int, years: int, seed: int = 0) -> int:
+    """Write monthly weather rows for the given years to filepath, in the format of
+    datasets/weather_2014.csv, and return the number of rows written.
+
+    Preconditions:
+        - years > 0
+    """
+    rng = np.random.default_rng(seed)
+    months = 12 * years
+    temperature = seasonal_temperature(np.arange(months) % 12 * 30.4 + 15)
+    temperature = np.round(temperature + rng.normal(0, 2, months), 2)
+    precipitation = np.round(rng.gamma(4, 1, months), 2)
+
+    with open(filepath, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(MONTHLY_WEATHER_HEADER)
+        for i in range(months):
+            year, month = start_year + i // 12, i % 12 + 1
+            writer.writerow([str(year) + str(month).zfill(2), temperature[i], precipitation[i]])
+    return months
+
+
+def write_disease(filepath: str, start_year: int, years: int, areas: int,
+                  seed: int = 0) -> int:
+    """Write weekly disease rows for the given MMWR years and number of reporting areas to
+    filepath, in the format of datasets/disease_2016.csv, and return the number of rows
+    written. Like the real data, weeks without a malaria case have a blank cell.
+
+    Preconditions:
+        - years > 0 and areas > 0
+    """
+    rng = np.random.default_rng(seed)
+    weeks = [(year, week) for year in range(start_year, start_year + years)
+             for week in range(1, weeks_in_year(year) + 1)]
+    day_of_year = np.array([week_start(year, week).timetuple().tm_yday + 3
+                            for year, week in weeks])
+
+    # Lyme cases grow with the seasonal temperature, scaled by the size of each area
+    expected_lyme = np.maximum(0.0, seasonal_temperature(day_of_year) - 30) * 3
+    area_scale = rng.gamma(2, 0.5, areas)
+
+    with open(filepath, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(DISEASE_HEADER)
+        for area in range(areas):
+            lyme = rng.poisson(expected_lyme * area_scale[area])
+            malaria = rng.poisson(0.5 * area_scale[area], len(weeks))
+            name = 'AREA ' + str(area + 1).zfill(5)
+            for i, (year, week) in enumerate(weeks):
+                writer.writerow([name, year, week, lyme[i], malaria[i] if malaria[i] else ''])
+    return areas * len(weeks)
+
+
+def generate_dataset(directory: str, start_year: int = 1970, years: int = 50,
+                     areas: int = 1000, seed: int = 0) -> Dict[str, str]:
+    """Write a daily weather file, a monthly weather file and a disease file covering the
+    given years (and, for the disease file, the given number of reporting areas) into
+    directory, and return a mapping from the kind of each file to its path.
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = {'daily_weather': os.path.join(directory, 'weather_daily.csv'),
+             'monthly_weather': os.path.join(directory, 'weather_monthly.csv'),
+             'disease': os.path.join(directory, 'disease.csv')}
+
+    write_daily_weather(paths['daily_weather'], start_year, years, seed)
+    write_monthly_weather(paths['monthly_weather'], start_year, years, seed)
+    write_disease(paths['disease'], start_year, years, areas, seed)
+    return paths
+
+
+if __name__ == '__main__':
+    import doctest
+
+    doctest.testmod(verbose=True)
+
+    import python_ta
+    python_ta.check_all(config={
+        'extra-imports': ['csv', 'datetime', 'os', 'typing', 'numpy', 'mmwr_calendar',
+                          'python_ta'],
+        'allowed-io': ['write_daily_weather', 'write_monthly_weather', 'write_disease'],
+        'max-line-length': 100,
+        'disable': ['R1705', 'C0200']
+    })
@@ -0,0 +1,338 @@
+"""CSC110 final project, main module
+
+Descriptions
+===============================
+
+This module loads many weather and disease files concurrently, such as a whole archive of
+stations and reporting areas kept on network-mounted storage.
+
+Files are read by a pool of threads, so that waiting on one file does not hold up the
+others, and the text of each file is parsed by a pool of processes into monthly summaries.
+The summaries are folded into a MonthlyAggregator in the main thread as soon as each file
+is parsed, in whatever order they finish. At most a given number of files are in flight
+(being read, waiting to be parsed or being parsed) at any time, which bounds both the open
+connections to the storage and the memory held by file contents.
+
+Weather series are kept apart by station (by default, the name of the file they come
+from), just as disease series are kept apart by reporting area.
+
+Copyright and Usage Information
+===============================
+
+All forms of distribution of this code, whether as given or with any changes, are
+expressly prohibited. All rights reserved.
+
+This file is Copyright (c) 2020 Runshi Yang, Chenxu Wang and Haojun Qiu
+"""
+import csv
+import io
+import itertools
+import os
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, \
+    FIRST_COMPLETED, wait
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from data_class import MonthlyStats, ClimateTable, DiseaseTable, month_index
+from mmwr_calendar import month_weights
+from read_data import climate_variable_names, daily_climate_stats, parse_climate_value, \
+    SUMMED_CLIMATE_VARIABLES
+
+# The summaries parsed from one file: the summary of each (year, month) of each series.
+# Weather series are named by (station, climate variable), and disease series by
+# (area, disease).
+Summaries = Dict[Tuple[str, str], Dict[Tuple[int, int], MonthlyStats]]
+
+# The kinds of files that can be ingested
+FILE_KINDS = ('weather', 'disease')
+
+
+class MonthlyAggregator:
+    """The monthly summaries of every series, merged from any number of files.
+
+    Instance Attributes:
+      - weather: the summary of each (year, month) of each (station, climate variable),
+        with the series in the order they were first seen
+      - disease: the summary of each (year, month) of each (area, disease), with the
+        series in the order they were first seen
+      - files: the number of files merged so far
+
+    Representation Invariants:
+      - self.files >= 0
+    """
+    __slots__ = ('weather', 'disease', 'files')
+    weather: Summaries
+    disease: Summaries
+    files: int
+
+    def __init__(self) -> None:
+        self.weather = {}
+        self.disease = {}
+        self.files = 0
+
+    def merge(self, kind: str, summaries: Summaries) -> None:
+        """Fold the summaries parsed from one 'weather' or 'disease' file into this
+        aggregator.
+
+        Preconditions:
+            - kind in FILE_KINDS
+
+        >>> aggregator = MonthlyAggregator()
+        >>> for total in [2.0, 3.0]:
+        ...     month = MonthlyStats(1, total, total, total)
+        ...     aggregator.merge('weather', {('a', 'snow fall'): {(2016, 1): month}})
+        >>> aggregator.weather[('a', 'snow fall')][(2016, 1)].total
+        5.0
+        """
+        stats = self.weather if kind == 'weather' else self.disease
+        for series, months in summaries.items():
+            if series not in stats:
+                stats[series] = {}
+            merged = stats[series]
+            for key, month in months.items():
+                if key in merged:
+                    merged[key].merge(month)
+                else:
+                    merged[key] = month
+        self.files += 1
+
+    @staticmethod
+    def values(stats: Summaries, series: List[Tuple[str, str]],
+               summed: Callable[[str], bool]) -> Tuple[List[int], np.ndarray]:
+        """Return the month_index of every month seen in any of the given series of stats,
+        in order, and the value of each series in each of those months.
+
+        A series whose second name is summed takes the total of each month, and any other
+        series takes the mean. Months missing from a series are NaN.
+        """
+        keys = sorted({key for name in series for key in stats.get(name, {})})
+        values = np.full((len(keys), len(series)), np.nan)
+        for j, name in enumerate(series):
+            months = stats.get(name, {})
+            for i, key in enumerate(keys):
+                if key in months:
+                    values[i, j] = months[key].total if summed(name[1]) else months[key].mean()
+        return ([month_index(key[0], key[1]) for key in keys], values)
+
+    def stations(self) -> List[str]:
+        """Return every weather station merged so far, in order."""
+        return sorted({name[0] for name in self.weather})
+
+    def climate_table(self, station: str) -> ClimateTable:
+        """Return the monthly values of every climate variable of the given station merged
+        so far, aggregated as in read_data.load_weather_table.
+
+        Preconditions:
+            - station in self.stations()
+        """
+        series = [name for name in self.weather if name[0] == station]
+        months, values = self.values(self.weather, series,
+                                     lambda variable: variable in SUMMED_CLIMATE_VARIABLES)
+        return ClimateTable(months, [name[1] for name in series], values)
+
+    def areas(self) -> List[str]:
+        """Return every reporting area merged so far, in order."""
+        return sorted({name[0] for name in self.disease})
+
+    def disease_table(self, area: str, diseases: Optional[List[str]] = None) -> DiseaseTable:
+        """Return the monthly cases of the given diseases (by default, every disease) in the
+        given area, as in read_data.load_disease_panel_table.
+
+        Preconditions:
+            - area in self.areas()
+        """
+        if diseases is None:
+            diseases = [name[1] for name in self.disease if name[0] == area]
+        months, values = self.values(self.disease, [(area, disease) for disease in diseases],
+                                     lambda disease: True)
+        return DiseaseTable(months, diseases, values)
+
+
+def read_text(filepath: str) -> str:
+    """Return the whole contents of the given file."""
+    with open(filepath, newline='') as file:
+        return file.read()
+
+
+def file_station(filepath: str) -> str:
+    """Return the name of the file at filepath without its directory and extension, which
+    names the station of a weather file by default.
+
+    >>> file_station('archive/central_park.csv')
+    'central_park'
+    """
+    return os.path.splitext(os.path.basename(filepath))[0]
+
+
+def parse_weather(text: str, station: str) -> Summaries:
+    """Return the monthly summaries of every climate variable of the given station in the
+    given contents of a weather file, with either daily rows (like
+    datasets/weather_2016.csv) or monthly rows (like datasets/weather_2014.csv).
+
+    >>> summaries = parse_weather('date,precipitation\\n1-1-2016,T\\n2-1-2016,0.5\\n', 'a')
+    >>> summaries[('a', 'precipitation')][(2016, 1)].total
+    0.5
+    """
+    reader = csv.reader(io.StringIO(text))
+    names = climate_variable_names(next(reader))
+    first_row = next(reader, None)
+    if first_row is None:
+        return {}
+    rows = itertools.chain([first_row], reader)
+
+    # Daily rows are dated day-month-year, monthly rows are dated YYYYMM
+    if '-' in first_row[0]:
+        stats = daily_climate_stats(len(names), rows)
+    else:
+        stats = {}
+        for row in rows:
+            key = (int(row[0][:4]), int(row[0][4:]))
+            stats[key] = [MonthlyStats() for _ in names]
+            for month, cell in zip(stats[key], row[1:]):
+                month.add(parse_climate_value(cell))
+
+    return {(station, name): {key: stats[key][j] for key in stats}
+            for j, name in enumerate(names)}
+
+
+def parse_disease(text: str) -> Summaries:
+    """Return the monthly summaries of the cases of every disease in every reporting area
+    in the given contents of a disease file (like datasets/disease_2016.csv), with the
+    weekly cases apportioned to months as in mmwr_calendar.apportion_to_months.
+
+    The total of each summary is the number of cases in that month. Blank cells count as
+    no cases.
+
+    >>> summaries = parse_disease('Reporting Area,MMWR Year,MMWR Week,Lyme disease, x\\n'
+    ...                           'OHIO,2016,5,7\\n')
+    >>> sorted(summaries[('OHIO', 'Lyme disease')].items())[1][1].total
+    6.0
+    """
+    reader = csv.reader(io.StringIO(text))
+
+    # Disease columns are named like 'Lyme disease, Current week'
+    header = next(reader)
+    diseases = [str.split(column, ',')[0] for column in header[3:]]
+
+    summaries = {}
+    for row in reader:
+        add_disease_row(summaries, diseases, row)
+    return summaries
+
+
+def add_disease_row(summaries: Summaries, diseases: List[str], row: List[str]) -> None:
+    """Fold the weekly cases of the given diseases in one row of a disease file into
+    summaries, apportioned to months.
+
+    The row is parsed completely before anything is folded, so a row that raises
+    ValueError leaves summaries unchanged.
+
+    >>> summaries = {}
+    >>> add_disease_row(summaries, ['Lyme disease'], ['OHIO', '2016', '60', '1'])
+    Traceback (most recent call last):
+    ValueError: 2016 has no MMWR week 60
+    >>> summaries
+    {}
+    """
+    year, week = int(row[1]), int(row[2])
+    weeks = month_weights(year)
+    if not 1 <= week <= len(weeks):
+        raise ValueError(str(year) + ' has no MMWR week ' + str(week))
+    cases = [float(cell) if cell != '' else 0.0 for cell in row[3:3 + len(diseases)]]
+
+    for disease, weekly_cases in zip(diseases, cases):
+        if (row[0], disease) not in summaries:
+            summaries[(row[0], disease)] = {}
+        months = summaries[(row[0], disease)]
+        for key, fraction in weeks[week - 1]:
+            if key not in months:
+                months[key] = MonthlyStats()
+            months[key].add(weekly_cases * fraction)
+
+
+def parse_file(kind: str, text: str, station: str) -> Summaries:
+    """Return the monthly summaries in the given contents of a 'weather' or 'disease' file,
+    where the weather comes from the given station.
+
+    Preconditions:
+        - kind in FILE_KINDS
+    """
+    if kind == 'weather':
+        return parse_weather(text, station)
+    else:
+        return parse_disease(text)
+
+
+def ingest(weather_paths: Iterable[str] = (), disease_paths: Iterable[str] = (),
+           max_files: int = 8, max_workers: Optional[int] = None,
+           on_file: Optional[Callable[[str, Summaries], None]] = None,
+           station_of: Callable[[str], str] = file_station) -> MonthlyAggregator:
+    """Load every given weather and disease file concurrently, and return the aggregator
+    of all their monthly summaries.
+
+    At most max_files files are in flight at once; these are read by as many threads.
+    The files are parsed by max_workers processes (by default, one per core), or by the
+    reading threads themselves when max_workers is 0. on_file, if given, is called in the
+    main thread with the path and the summaries of each file as soon as it is parsed,
+    before they are merged.
+
+    The weather of each file belongs to the station station_of(path), by default the name
+    of the file, and each station gets its own series (see MonthlyAggregator.climate_table).
+    Files of the same station (such as one station's files split by year) are merged when
+    station_of names them alike.
+
+    Preconditions:
+        - max_files > 0
+        - max_workers is None or max_workers >= 0
+    """
+    jobs = itertools.chain((('weather', path) for path in weather_paths),
+                           (('disease', path) for path in disease_paths))
+    aggregator = MonthlyAggregator()
+
+    with ThreadPoolExecutor(max_workers=max_files) as readers:
+        parsers: Executor = readers if max_workers == 0 else \
+            ProcessPoolExecutor(max_workers=max_workers)
+        try:
+            # Each future in flight maps to its (stage, kind, path)
+            in_flight: Dict[Future, Tuple[str, str, str]] = {}
+
+            def start_next() -> None:
+                job = next(jobs, None)
+                if job is not None:
+                    in_flight[readers.submit(read_text, job[1])] = ('read',) + job
+
+            for _ in range(max_files):
+                start_next()
+
+            while in_flight:
+                done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage, kind, path = in_flight.pop(future)
+                    if stage == 'read':
+                        in_flight[parsers.submit(parse_file, kind, future.result(),
+                                                 station_of(path))] = ('parse', kind, path)
+                    else:
+                        summaries = future.result()
+                        if on_file is not None:
+                            on_file(path, summaries)
+                        aggregator.merge(kind, summaries)
+                        start_next()
+        finally:
+            if parsers is not readers:
+                parsers.shutdown()
+
+    return aggregator
+
+
+if __name__ == '__main__':
+    import doctest
+
+    doctest.testmod(verbose=True)
+
+    import python_ta
+    python_ta.check_all(config={
+        'extra-imports': ['csv', 'io', 'itertools', 'os', 'concurrent.futures', 'typing', 'numpy',
+                          'data_class', 'mmwr_calendar', 'read_data', 'python_ta'],
+        'allowed-io': ['read_text'],
+        'max-line-length': 100,
+        'disable': ['R1705', 'C0200']
+    })
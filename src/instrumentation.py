@@ -0,0 +1,331 @@
+"""CSC110 final project, main module
+
+Descriptions
+===============================
+
+This module records how long each stage of our pipeline (parsing, date conversion,
+month bucketing, fitting, plotting) takes, how many times it runs, how many rows it
+processes and how much memory it allocates at its peak.
+
+Instrumentation is opt-in. The profiling mode is read from the PROFILE_MODE environment
+variable, and is 'off' by default:
+  - 'off': record nothing, so an instrumented function costs one extra check per call,
+    and a per-row function (instrumented with memory=False) costs nothing at all
+  - 'summary': print a table of every stage when the program exits
+  - 'trace': also write every stage run as a Chrome trace event (viewable in
+    chrome://tracing or Perfetto) to the JSON file named by PROFILE_TRACE
+
+Stage times are inclusive: a stage's seconds include the stages it calls, and its
+self seconds do not. Peak memory is traced with tracemalloc, which slows down
+allocation-heavy code while profiling is on. tracemalloc traces the whole process, so
+peak memory is only recorded for stages run on the main thread (stages of background
+threads, such as the plot worker or ingestion threads, record a peak of 0), and the peak
+of a main thread stage includes whatever other threads allocated while it ran.
+
+Copyright and Usage Information
+===============================
+
+All forms of distribution of this code, whether as given or with any changes, are
+expressly prohibited. All rights reserved.
+
+This file is Copyright (c) 2020 Runshi Yang, Chenxu Wang and Haojun Qiu
+"""
+import atexit
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+PROFILE_MODES = ('off', 'summary', 'trace')
+
+# The current profiling mode, and the file the trace is written to in 'trace' mode
+profile_mode = 'off'
+trace_path = 'profile_trace.json'
+
+
+@dataclass
+class StageStats:
+    """The totals of every run of one stage of the pipeline.
+
+    Instance Attributes:
+      - calls: the number of times the stage ran
+      - seconds: the total wall time of the stage, including the stages it called
+      - self_seconds: the total wall time of the stage, excluding the stages it called
+      - rows: the total number of rows the stage processed
+      - peak_bytes: the largest peak allocation of any one run of the stage on the main
+        thread
+
+    Representation Invariants:
+      - self.calls >= 0 and self.rows >= 0
+      - 0 <= self.self_seconds <= self.seconds
+    """
+    calls: int = 0
+    seconds: float = 0.0
+    self_seconds: float = 0.0
+    rows: int = 0
+    peak_bytes: int = 0
+
+
+@dataclass
+class RunningStage:
+    """A stage that is running right now.
+
+    Instance Attributes:
+      - name: the name of the stage
+      - start: the time.perf_counter() value when the stage started
+      - start_bytes: the memory traced when the stage started
+      - peak: the largest memory traced during the stage so far
+      - child_seconds: the wall time spent in the stages it called so far
+      - rows: the number of rows the stage processed so far
+    """
+    name: str
+    start: float
+    start_bytes: int = 0
+    peak: int = 0
+    child_seconds: float = 0.0
+    rows: int = 0
+
+
+# The totals of each stage, and the trace events recorded in 'trace' mode
+stages: Dict[str, StageStats] = {}
+events: List[Dict[str, Any]] = []
+stats_lock = threading.Lock()
+
+# The stack of stages running in each thread, innermost last
+running = threading.local()
+
+
+def set_profile_mode(mode: str, path: str = 'profile_trace.json') -> None:
+    """Set the profiling mode, and the file the trace is written to in 'trace' mode.
+
+    Preconditions:
+        - mode in PROFILE_MODES
+    """
+    global profile_mode, trace_path
+
+    if mode == 'off':
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+    elif not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+    profile_mode = mode
+    trace_path = path
+
+
+def running_stages() -> List[RunningStage]:
+    """Return the stack of stages running in the current thread."""
+    if not hasattr(running, 'stack'):
+        running.stack = []
+    return running.stack
+
+
+def reset() -> None:
+    """Forget every stage and trace event recorded so far."""
+    with stats_lock:
+        stages.clear()
+        events.clear()
+
+
+def record_rows(rows: int) -> None:
+    """Add the given number of rows to the innermost stage running in the current thread.
+    Does nothing when profiling is off or no stage is running."""
+    if profile_mode != 'off':
+        stack = running_stages()
+        if stack:
+            stack[-1].rows += rows
+
+
+def record(name: str, seconds: float, self_seconds: float, rows: int, peak_bytes: int) -> None:
+    """Add one run of the given stage to its totals."""
+    with stats_lock:
+        if name not in stages:
+            stages[name] = StageStats()
+        stats = stages[name]
+        stats.calls += 1
+        stats.seconds += seconds
+        stats.self_seconds += self_seconds
+        stats.rows += rows
+        stats.peak_bytes = max(stats.peak_bytes, peak_bytes)
+
+
+@contextlib.contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Record the code run inside this context as one run of the given stage.
+
+    >>> set_profile_mode('summary')
+    >>> with stage('outer'):
+    ...     with stage('inner'):
+    ...         record_rows(10)
+    >>> stages['outer'].calls, stages['inner'].rows
+    (1, 10)
+    >>> stages['outer'].self_seconds <= stages['outer'].seconds
+    True
+    >>> set_profile_mode('off'); reset()
+    """
+    if profile_mode == 'off':
+        yield
+        return
+
+    stack = running_stages()
+
+    # The traced peak is shared by every thread, so only the main thread resets and reads it
+    traced = threading.current_thread() is threading.main_thread()
+    current = 0
+    if traced:
+        current, peak = tracemalloc.get_traced_memory()
+        if stack:
+            # The traced peak is about to be reset, so the enclosing stage keeps the peak so far
+            stack[-1].peak = max(stack[-1].peak, peak)
+        tracemalloc.reset_peak()
+
+    frame = RunningStage(name, time.perf_counter(), current, current)
+    list.append(stack, frame)
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - frame.start
+        list.pop(stack)
+        peak = max(frame.peak, tracemalloc.get_traced_memory()[1]) if traced else 0
+        if stack:
+            stack[-1].child_seconds += seconds
+            stack[-1].peak = max(stack[-1].peak, peak)
+
+        record(name, seconds, seconds - frame.child_seconds, frame.rows,
+               peak - frame.start_bytes)
+        if profile_mode == 'trace':
+            with stats_lock:
+                list.append(events, {'name': name, 'ph': 'X', 'pid': os.getpid(),
+                                     'tid': threading.get_ident(),
+                                     'ts': frame.start * 1e6, 'dur': seconds * 1e6,
+                                     'args': {'rows': frame.rows,
+                                              'peak_bytes': peak - frame.start_bytes}})
+
+
+def instrument(name: str, rows: Optional[Callable[[Any], int]] = None,
+               memory: bool = True) -> Callable[[Callable], Callable]:
+    """Return a decorator that records every call of the decorated function as a run of
+    the given stage.
+
+    rows, if given, computes the number of rows processed from the function's return
+    value; otherwise the function may report them with record_rows.
+
+    With memory=False, only the calls and the wall time are recorded, without tracing
+    memory or writing trace events, and each call counts as one row. This is meant for
+    small functions called once per row, where a full stage would cost far more than the
+    function itself. Such a function is only wrapped if profiling is on when it is
+    decorated, so that it costs nothing when profiling is off; its stage is therefore
+    only recorded when PROFILE_MODE is set before its module is imported.
+    """
+    def decorate(function: Callable) -> Callable:
+        if not memory:
+            if profile_mode == 'off':
+                return function
+
+            @functools.wraps(function)
+            def timed(*args: Any, **kwargs: Any) -> Any:
+                if profile_mode == 'off':
+                    return function(*args, **kwargs)
+
+                start = time.perf_counter()
+                result = function(*args, **kwargs)
+                seconds = time.perf_counter() - start
+
+                stack = running_stages()
+                if stack:
+                    stack[-1].child_seconds += seconds
+                record(name, seconds, seconds, 1, 0)
+                return result
+
+            return timed
+
+        @functools.wraps(function)
+        def profiled(*args: Any, **kwargs: Any) -> Any:
+            if profile_mode == 'off':
+                return function(*args, **kwargs)
+
+            with stage(name):
+                result = function(*args, **kwargs)
+                if rows is not None:
+                    record_rows(rows(result))
+                return result
+
+        return profiled
+
+    return decorate
+
+
+def summary() -> str:
+    """Return a table of the totals of every stage recorded so far, slowest first.
+
+    >>> set_profile_mode('summary')
+    >>> with stage('parse'):
+    ...     record_rows(1000)
+    >>> print(summary().splitlines()[0])
+    stage                           calls    seconds  self sec.        rows     rows/s   peak MiB
+    >>> set_profile_mode('off'); reset()
+    """
+    lines = ['stage'.ljust(30) + 'calls'.rjust(7) + 'seconds'.rjust(11) + 'self sec.'.rjust(11)
+             + 'rows'.rjust(12) + 'rows/s'.rjust(11) + 'peak MiB'.rjust(11)]
+    with stats_lock:
+        ordered = sorted(stages.items(), key=lambda item: item[1].seconds, reverse=True)
+
+    for name, stats in ordered:
+        throughput = str(round(stats.rows / stats.seconds)) if stats.rows and stats.seconds \
+            else '-'
+        list.append(lines, name[:30].ljust(30) + str(stats.calls).rjust(7)
+                    + format(stats.seconds, '.4f').rjust(11)
+                    + format(stats.self_seconds, '.4f').rjust(11)
+                    + str(stats.rows).rjust(12) + throughput.rjust(11)
+                    + format(stats.peak_bytes / 2 ** 20, '.2f').rjust(11))
+    return '\n'.join(lines)
+
+
+def write_trace(path: str) -> None:
+    """Write the trace events and the totals of every stage recorded so far to path as JSON,
+    in the Chrome trace event format."""
+    with stats_lock:
+        trace = {'traceEvents': list(events),
+                 'stages': {name: asdict(stats) for name, stats in stages.items()}}
+    with open(path, 'w') as file:
+        json.dump(trace, file)
+
+
+def finish() -> None:
+    """Print the summary of every stage, and write the trace in 'trace' mode, if anything
+    was recorded."""
+    if profile_mode == 'off' or not stages:
+        return
+
+    print(summary())
+    if profile_mode == 'trace':
+        write_trace(trace_path)
+        print('Trace written to', trace_path)
+
+
+set_profile_mode(os.environ.get('PROFILE_MODE', 'off'),
+                 os.environ.get('PROFILE_TRACE', 'profile_trace.json'))
+
+# Report at exit; this module is imported before rendering, so this runs after the queued
+# plots have been written
+atexit.register(finish)
+
+
+if __name__ == '__main__':
+    import doctest
+
+    doctest.testmod(verbose=True)
+
+    import python_ta
+    python_ta.check_all(config={
+        'extra-imports': ['atexit', 'contextlib', 'functools', 'json', 'os', 'threading', 'time',
+                          'tracemalloc', 'dataclasses', 'typing', 'python_ta'],
+        'allowed-io': ['write_trace', 'finish'],
+        'max-line-length': 100,
+        'disable': ['R1705', 'C0200', 'W0603']
+    })
@@ -0,0 +1,179 @@
+"""CSC110 final project, main module
+
+Descriptions
+===============================
+
+This module searches for the lag between climate and disease: how many months after a
+warm (or wet) month the disease cases follow. For every lag k from 0 to some maximum, it
+fits the simple linear regression of each month's cases on the climate k months earlier,
+and reports the correlation and R squared value of each lag along with the best lag.
+
+Instead of refitting each lag with perform_regression, the sums of products of every
+lag are computed together: the cross products as one FFT cross-correlation, and the sums
+and sums of squares of each lag's overlapping months as differences of cumulative sums.
+Any number of (region, variable) series are scanned at once along the leading axes.
+
+Copyright and Usage Information
+===============================
+
+All forms of distribution of this code, whether as given or with any changes, are
+expressly prohibited. All rights reserved.
+
+This file is Copyright (c) 2020 Runshi Yang, Chenxu Wang and Haojun Qiu
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+import numpy as np
+from data_class import MonthlyTable
+
+
+@dataclass
+class LagScan:
+    """The simple linear regressions of a response on a predictor at every lag from 0 to
+    some maximum, for one or more series.
+
+    At lag k, the response of month t is paired with the predictor of month t - k, over
+    the n - k months where both are known. Any leading axes of the arrays are the series.
+
+    Instance Attributes:
+      - lags: the lags scanned, 0 to the maximum
+      - n: the number of paired months at each lag
+      - correlation: the correlation of each series at each lag, with shape (..., lags)
+      - r_squared: the R squared value of each series at each lag
+      - intercepts: the intercept of the regression of each series at each lag
+      - slopes: the slope of the regression of each series at each lag
+
+    Representation Invariants:
+      - self.correlation.shape == self.r_squared.shape == self.slopes.shape
+      - self.correlation.shape[-1] == len(self.lags) == len(self.n)
+    """
+    lags: np.ndarray
+    n: np.ndarray
+    correlation: np.ndarray
+    r_squared: np.ndarray
+    intercepts: np.ndarray
+    slopes: np.ndarray
+
+    def best_lags(self) -> np.ndarray:
+        """Return the lag with the largest R squared value in each series."""
+        return self.lags[np.nanargmax(self.r_squared, axis=-1)]
+
+    def best_r_squared(self) -> np.ndarray:
+        """Return the largest R squared value over all lags in each series."""
+        return np.nanmax(self.r_squared, axis=-1)
+
+
+def lagged_cross_products(x: np.ndarray, y: np.ndarray, max_lag: int) -> np.ndarray:
+    """Return the sum over t of x[..., t - k] * y[..., t] for every lag k from 0 to max_lag,
+    computed as an FFT cross-correlation along the last axis.
+
+    The arrays are zero-padded to twice their length, so the circular correlation of the
+    FFT does not wrap around.
+
+    >>> lagged_cross_products(np.array([1.0, 2.0, 3.0]), np.array([4.0, 5.0, 6.0]),
+    ...                       2).round(6).tolist()
+    [32.0, 17.0, 6.0]
+    """
+    length = 2 * x.shape[-1]
+    spectrum = np.conj(np.fft.rfft(x, length)) * np.fft.rfft(y, length)
+    return np.fft.irfft(spectrum, length)[..., :max_lag + 1]
+
+
+def lag_scan(x: np.ndarray, y: np.ndarray, max_lag: int) -> LagScan:
+    """Fit the simple linear regression of y on x lagged by every k from 0 to max_lag.
+
+    x and y hold consecutive monthly values along their last axis, and their leading axes
+    (if any) are broadcast against each other, so one climate series can be scanned
+    against many disease series, or the other way round.
+
+    Preconditions:
+        - x.shape[-1] == y.shape[-1]
+        - 0 <= max_lag <= x.shape[-1] - 3
+        - every series holds consecutive months, without gaps
+
+    >>> months = np.arange(36.0)
+    >>> temperature = np.sin(2 * np.pi * months / 12)
+    >>> cases = 5 + 3 * np.roll(temperature, 2)
+    >>> scan = lag_scan(temperature, cases, 6)
+    >>> int(scan.best_lags()), round(float(scan.best_r_squared()), 6)
+    (2, 1.0)
+    >>> round(float(scan.slopes[2]), 6), round(float(scan.intercepts[2]), 6)
+    (3.0, 5.0)
+    """
+    x, y = np.broadcast_arrays(np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64))
+    length = x.shape[-1]
+    lags = np.arange(max_lag + 1)
+    n = (length - lags).astype(np.float64)
+
+    # Centre each series on its overall mean, so the sums do not lose precision
+    mean_x = x.mean(axis=-1, keepdims=True)
+    mean_y = y.mean(axis=-1, keepdims=True)
+    xc = x - mean_x
+    yc = y - mean_y
+
+    # At lag k, x is used over months 0 .. n - k - 1 and y over months k .. n - 1
+    zeros = np.zeros(x.shape[:-1] + (1,))
+    cum_x = np.concatenate((zeros, np.cumsum(xc, axis=-1)), axis=-1)
+    cum_xx = np.concatenate((zeros, np.cumsum(xc * xc, axis=-1)), axis=-1)
+    cum_y = np.concatenate((zeros, np.cumsum(yc, axis=-1)), axis=-1)
+    cum_yy = np.concatenate((zeros, np.cumsum(yc * yc, axis=-1)), axis=-1)
+
+    sum_x = cum_x[..., length - lags]
+    sum_xx = cum_xx[..., length - lags]
+    sum_y = cum_y[..., length:] - cum_y[..., lags]
+    sum_yy = cum_yy[..., length:] - cum_yy[..., lags]
+    sum_xy = lagged_cross_products(xc, yc, max_lag)
+
+    sxx = sum_xx - sum_x * sum_x / n
+    syy = sum_yy - sum_y * sum_y / n
+    sxy = sum_xy - sum_x * sum_y / n
+    correlation = sxy / np.sqrt(sxx * syy)
+
+    slopes = sxy / sxx
+    intercepts = (sum_y - slopes * sum_x) / n + mean_y - slopes * mean_x
+    return LagScan(lags, (length - lags), correlation, correlation * correlation,
+                   intercepts, slopes)
+
+
+def table_lag_scan(table: MonthlyTable, predictors: List[str], responses: List[str],
+                   max_lag: int) -> LagScan:
+    """Scan every pair of the given predictor and response columns of table at once. The
+    result has one series for each (predictor, response) pair, in that order, along its
+    first two axes.
+
+    Preconditions:
+        - all(name in table.names for name in predictors + responses)
+        - the months of table are consecutive
+        - 0 <= max_lag <= len(table) - 3
+    """
+    x = table.select(predictors).T[:, np.newaxis, :]
+    y = table.select(responses).T[np.newaxis, :, :]
+    return lag_scan(x, y, max_lag)
+
+
+def best_lag_report(scan: LagScan, predictors: List[str],
+                    responses: List[str]) -> Dict[Tuple[str, str], Tuple[int, float, float]]:
+    """Return the (best lag, correlation, R squared) of each (predictor, response) pair of
+    a scan returned by table_lag_scan."""
+    best = scan.best_lags()
+    report_so_far = {}
+    for i, predictor in enumerate(predictors):
+        for j, response in enumerate(responses):
+            lag = int(best[i, j])
+            report_so_far[(predictor, response)] = (lag, float(scan.correlation[i, j, lag]),
+                                                    float(scan.r_squared[i, j, lag]))
+    return report_so_far
+
+
+if __name__ == '__main__':
+    import doctest
+
+    doctest.testmod(verbose=True)
+
+    import python_ta
+    python_ta.check_all(config={
+        'extra-imports': ['dataclasses', 'typing', 'numpy', 'data_class', 'python_ta'],
+        'allowed-io': [],
+        'max-line-length': 100,
+        'disable': ['R1705', 'C0200']
+    })
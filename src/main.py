@@ -14,21 +14,32 @@ expressly prohibited. All rights reserved.
 
 This file is Copyright (c) 2020 Runshi Yang, Chenxu Wang and Haojun Qiu
 """
-from typing import Tuple
+from typing import List, Tuple
 from simple_regression import perform_regression, predict
-from multiple_regression import multiple_linear_regression
+from multiple_regression import MultipleRegressionModel, build_multiple_regression, \
+    report_multiple_regression
+from model_registry import get_model
+from sweep import SweepResult, make_grid, run_sweep
+from subset_selection import SubsetFit, table_subset_search
 from read_data import temp_disease_list_2016, temp_disease_list_2014,\
-    prec_disease_list_2016, prec_disease_list_2014, multiple_2014_data
+    prec_disease_list_2016, prec_disease_list_2014, multiple_2014_table, load_monthly_table
+
+# The files our models are trained on
+TRAIN_FILES = ('datasets/weather_2014.csv', 'datasets/disease_2014.csv')
 
 
 def generate_temp_lyme_model() -> Tuple[float, float, float]:
     """Use the weather and disease data of 2014 to generate a sample linear regression model
     Return (a, b, r_squared) for the generated model
+    The model is only generated (and plotted) once, unless the 2014 data changes.
     """
-    train_data = temp_disease_list_2014('datasets/weather_2014.csv', 'datasets/disease_2014.csv')
+    def fit() -> Tuple[float, float, float]:
+        train_data = temp_disease_list_2014(TRAIN_FILES[0], TRAIN_FILES[1])
+
+        return perform_regression(train_data, "temperature",
+                                  "temperature-lyme sample linear regression model")
 
-    return perform_regression(train_data, "temperature",
-                              "temperature-lyme sample linear regression model")
+    return get_model(TRAIN_FILES, 'temperature-lyme simple', fit)
 
 
 def perform_temp_lyme_prediction() -> float:
@@ -44,11 +55,15 @@ def perform_temp_lyme_prediction() -> float:
 def generate_prec_lyme_model() -> Tuple[float, float, float]:
     """Use the precipitation and disease data of 2014 to generate a sample linear regression model
     Return (a, b, r_squared) for the generated model
+    The model is only generated (and plotted) once, unless the 2014 data changes.
     """
-    train_data = prec_disease_list_2014('datasets/weather_2014.csv', 'datasets/disease_2014.csv')
+    def fit() -> Tuple[float, float, float]:
+        train_data = prec_disease_list_2014(TRAIN_FILES[0], TRAIN_FILES[1])
 
-    return perform_regression(train_data, "precipitation",
-                              "precipitation-lyme sample linear regression model")
+        return perform_regression(train_data, "precipitation",
+                                  "precipitation-lyme sample linear regression model")
+
+    return get_model(TRAIN_FILES, 'precipitation-lyme simple', fit)
 
 
 def perform_prec_lyme_prediction() -> float:
@@ -61,14 +76,46 @@ def perform_prec_lyme_prediction() -> float:
                    "prediction by precipitation-lyme sample linear regression model")
 
 
-def perform_multiple_regression(temp: float, prec: float) -> None:
+def perform_multiple_regression(temp: float, prec: float) -> MultipleRegressionModel:
     """Use the temperature, precipitation and disease data of 2014 to generate
     a multiple linear regression model.
     Print r_squared, adjusted_r_squared, Intercept, Coefficients for the generated model and
     the predicted number of lyme cases for the input temperature and precipitation
+    Return the generated model.
+    The model is only generated (and plotted) once, unless the 2014 data changes.
+    """
+    def fit() -> MultipleRegressionModel:
+        train_data = multiple_2014_table(TRAIN_FILES[0], TRAIN_FILES[1])
+        return build_multiple_regression(train_data.as_dict())
+
+    model = get_model(TRAIN_FILES, 'temperature-precipitation-lyme multiple', fit)
+    report_multiple_regression(model, temp, prec)
+    return model
+
+
+def perform_lyme_sweep() -> List[SweepResult]:
+    """Train on 2014 and test on 2016 every model of lyme cases in New York, by temperature,
+    by precipitation and by both, using all available cores.
+    Return the result of each model, without plotting.
+    """
+    tasks = make_grid([2014], [2016], ['NEW YORK'], ['Lyme disease'],
+                      [('temperature',), ('precipitation',), ('temperature', 'precipitation')])
+    return run_sweep(tasks)
+
+
+def perform_lyme_subset_search(squares: bool = False, interactions: bool = False,
+                               max_predictors: int = 4) -> List[SubsetFit]:
+    """Fit lyme cases in New York in 2016 on every subset of at most max_predictors of the
+    daily weather columns (maximum, minimum and average temperature, precipitation, snow
+    fall and snow depth), optionally with their squares and interactions, using
+    leave-one-out cross-validation.
+    Return the fits ranked by adjusted R squared value, best first.
     """
-    test_data = multiple_2014_data('datasets/weather_2014.csv', 'datasets/disease_2014.csv')
-    return multiple_linear_regression(test_data, temp, prec)
+    table = load_monthly_table('datasets/weather_2016.csv', 'datasets/disease_2016.csv',
+                               'NEW YORK')
+    weather = [name for name in table.names if name not in ('Lyme disease', 'Malaria')]
+    return table_subset_search(table, weather, 'Lyme disease', squares, interactions,
+                               max_predictors, folds=None)
 
 
 if __name__ == '__main__':
@@ -79,7 +126,8 @@ if __name__ == '__main__':
     import python_ta
     python_ta.check_all(config={
         'extra-imports': ['typing', 'simple_regression',
-                          'multiple_regression', 'read_data', 'python_ta'],
+                          'multiple_regression', 'model_registry', 'read_data', 'sweep',
+                          'subset_selection', 'python_ta'],
         'allowed-io': [],
         'max-line-length': 100,
         'disable': ['R1705', 'C0200']
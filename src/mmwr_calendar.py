@@ -0,0 +1,155 @@
+"""CSC110 final project, main module
+
+Descriptions
+===============================
+
+This module contains the MMWR week calendar used by the CDC disease tables, and the
+functions that apportion weekly disease cases to calendar months.
+
+MMWR weeks run from Sunday to Saturday. Week 1 of an MMWR year is the first week
+with at least four days in that calendar year, i.e. the week containing January 4th,
+so an MMWR year has either 52 or 53 weeks, and its first and last weeks may overlap
+the neighbouring calendar years. The cases of a week are spread evenly over its seven
+days, so each month receives the fraction of the week's cases whose days fall in it.
+
+Copyright and Usage Information
+===============================
+
+All forms of distribution of this code, whether as given or with any changes, are
+expressly prohibited. All rights reserved.
+
+This file is Copyright (c) 2020 Runshi Yang, Chenxu Wang and Haojun Qiu
+"""
+import datetime
+import functools
+from typing import Dict, Iterable, List, Tuple
+import numpy as np
+from instrumentation import instrument
+
+
+def first_day(year: int) -> datetime.date:
+    """Return the Sunday that starts week 1 of the given MMWR year.
+
+    >>> first_day(2016)
+    datetime.date(2016, 1, 3)
+    >>> first_day(2015)
+    datetime.date(2015, 1, 4)
+    >>> first_day(2014)
+    datetime.date(2013, 12, 29)
+    """
+    january_4 = datetime.date(year, 1, 4)
+    # date.weekday() counts from Monday = 0, so this is the number of days since Sunday
+    return january_4 - datetime.timedelta(days=(january_4.weekday() + 1) % 7)
+
+
+def weeks_in_year(year: int) -> int:
+    """Return the number of weeks in the given MMWR year.
+
+    >>> weeks_in_year(2014), weeks_in_year(2016)
+    (53, 52)
+    """
+    return (first_day(year + 1) - first_day(year)).days // 7
+
+
+def week_start(year: int, week: int) -> datetime.date:
+    """Return the Sunday that starts the given week of the given MMWR year.
+
+    Preconditions:
+        - 1 <= week <= weeks_in_year(year)
+
+    >>> week_start(2016, 52)
+    datetime.date(2016, 12, 25)
+    """
+    return first_day(year) + datetime.timedelta(weeks=week - 1)
+
+
+@functools.lru_cache(maxsize=None)
+def month_weights(year: int) -> Tuple[Tuple[Tuple[Tuple[int, int], float], ...], ...]:
+    """Return, for each week of the given MMWR year, the fraction of that week falling in
+    each (year, month), as a tuple of ((year, month), fraction) pairs.
+
+    The result is computed once per year and then looked up.
+
+    >>> month_weights(2016)[0]
+    (((2016, 1), 1.0),)
+    >>> month_weights(2016)[4]
+    (((2016, 1), 0.14285714285714285), ((2016, 2), 0.8571428571428571))
+    """
+    weights_so_far = []
+    for week in range(1, weeks_in_year(year) + 1):
+        start = week_start(year, week)
+
+        days_per_month = {}
+        for offset in range(7):
+            day = start + datetime.timedelta(days=offset)
+            key = (day.year, day.month)
+            days_per_month[key] = days_per_month.get(key, 0) + 1
+
+        list.append(weights_so_far, tuple((key, days_per_month[key] / 7)
+                                          for key in sorted(days_per_month)))
+    return tuple(weights_so_far)
+
+
+@instrument('apportion weeks to months')
+def apportion_to_months(weekly_cases: Iterable[Tuple[int, int, float]]) \
+        -> Dict[Tuple[int, int], float]:
+    """Return the cases of each (year, month), given the cases of each MMWR week as
+    (MMWR year, MMWR week, cases) triples.
+
+    >>> monthly = apportion_to_months([(2016, 5, 7.0), (2016, 6, 14.0)])
+    >>> {key: round(monthly[key], 6) for key in monthly}
+    {(2016, 1): 1.0, (2016, 2): 20.0}
+    """
+    monthly_so_far = {}
+    for year, week, cases in weekly_cases:
+        for key, fraction in month_weights(year)[week - 1]:
+            monthly_so_far[key] = monthly_so_far.get(key, 0.0) + cases * fraction
+    return monthly_so_far
+
+
+def months_of_year(monthly_cases: Dict[Tuple[int, int], float], year: int) -> List[float]:
+    """Return the cases of each month of the given calendar year, in order, from the given
+    cases of each (year, month). Months without any case are 0.0.
+
+    >>> months_of_year({(2015, 12): 1.0, (2016, 1): 2.0}, 2016)[:2]
+    [2.0, 0.0]
+    """
+    return [monthly_cases.get((year, month), 0.0) for month in range(1, 13)]
+
+
+def month_weight_matrix(weeks: List[Tuple[int, int]]) \
+        -> Tuple[List[Tuple[int, int]], np.ndarray]:
+    """Return the (year, month) of each month touched by the given (MMWR year, MMWR week)
+    pairs in calendar order, along with a matrix whose entry [i, j] is the fraction of
+    weeks[i] falling in month j.
+
+    Multiplying weekly cases (with weeks along the last axis) by this matrix gives the
+    monthly cases.
+
+    >>> months, weights = month_weight_matrix([(2016, 5), (2016, 6)])
+    >>> months, weights.sum(axis=1).tolist()
+    ([(2016, 1), (2016, 2)], [1.0, 1.0])
+    """
+    months = sorted({key for year, week in weeks for key, _ in month_weights(year)[week - 1]})
+    positions = {key: j for j, key in enumerate(months)}
+
+    weights = np.zeros((len(weeks), len(months)))
+    for i, (year, week) in enumerate(weeks):
+        for key, fraction in month_weights(year)[week - 1]:
+            weights[i, positions[key]] = fraction
+    return (months, weights)
+
+
+if __name__ == '__main__':
+    import doctest
+
+    doctest.testmod(verbose=True)
+
+    import python_ta
+    python_ta.check_all(config={
+        'extra-imports': ['datetime', 'functools', 'typing', 'numpy', 'instrumentation',
+                          'python_ta'],
+        'allowed-io': [],
+        'max-line-length': 100,
+        'disable': ['R1705', 'C0200']
+    })
@@ -0,0 +1,78 @@
+"""CSC110 final project, main module
+
+Descriptions
+===============================
+
+This module contains an in-process registry of fitted models, so that a model is
+trained once and then reused by every prediction that needs it.
+
+Each model is keyed by the files of the dataset it was trained on and by a
+description of the model (its spec). A model is fitted again when any of its
+dataset files changes, or after it is invalidated explicitly.
+
+Copyright and Usage Information
+===============================
+
+All forms of distribution of this code, whether as given or with any changes, are
+expressly prohibited. All rights reserved.
+
+This file is Copyright (c) 2020 Runshi Yang, Chenxu Wang and Haojun Qiu
+"""
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+import dataset_cache
+
+# Maps (dataset files, spec) to (fingerprints of the dataset files, fitted model)
+registry: Dict[Tuple[Tuple[str, ...], str], Tuple[Tuple[str, ...], Any]] = {}
+
+
+def get_model(dataset: Sequence[str], spec: str, fit: Callable[[], Any]) -> Any:
+    """Return the model described by spec that was trained on the given dataset files,
+    calling fit to train it only if it is not registered yet or its files have changed.
+
+    Preconditions:
+        - all the files of dataset exist
+    """
+    key = (tuple(dataset), spec)
+    fingerprints = tuple(dataset_cache.fingerprint(path, spec) for path in dataset)
+
+    if key in registry and registry[key][0] == fingerprints:
+        return registry[key][1]
+
+    model = fit()
+    registry[key] = (fingerprints, model)
+    return model
+
+
+def invalidate(dataset: Optional[Sequence[str]] = None, spec: Optional[str] = None) -> None:
+    """Remove the registered models trained on the given dataset files and described by the
+    given spec, so that they are fitted again the next time they are needed.
+
+    Leaving dataset or spec as None matches every dataset or every spec, so invalidate()
+    removes every registered model.
+
+    >>> registry[(('a.csv',), 'linear')] = ((), 1)
+    >>> registry[(('b.csv',), 'linear')] = ((), 2)
+    >>> invalidate(dataset=['a.csv'])
+    >>> list(registry)
+    [(('b.csv',), 'linear')]
+    >>> invalidate()
+    >>> registry
+    {}
+    """
+    for key in list(registry):
+        if (dataset is None or key[0] == tuple(dataset)) and (spec is None or key[1] == spec):
+            del registry[key]
+
+
+if __name__ == '__main__':
+    import doctest
+
+    doctest.testmod(verbose=True)
+
+    import python_ta
+    python_ta.check_all(config={
+        'extra-imports': ['typing', 'dataset_cache', 'python_ta'],
+        'allowed-io': [],
+        'max-line-length': 100,
+        'disable': ['R1705', 'C0200']
+    })
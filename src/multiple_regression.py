@@ -14,50 +14,157 @@ expressly prohibited. All rights reserved.
 
 This file is Copyright (c) 2020 Runshi Yang, Chenxu Wang and Haojun Qiu
 """
-from typing import Dict
-import pandas as pd
-from sklearn import linear_model
-import matplotlib.pyplot as plt
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence, Tuple
 import numpy as np
+from decimation import thin_points
+from instrumentation import instrument, record_rows
+from rendering import render
+
+
+@dataclass
+class MultipleRegressionModel:
+    """A fitted multiple linear regression model y = intercept + x . coefficients.
+
+    Instance Attributes:
+      - predictors: the name of each predictor
+      - intercept: the intercept of the model
+      - coefficients: the coefficient of each predictor, in the same order
+      - r_squared: the R squared value of the model on the data it was fitted on
+      - adjusted_r_squared: the R squared value adjusted for the number of predictors
+      - n: the number of observations the model was fitted on
+
+    Representation Invariants:
+      - len(self.coefficients) == len(self.predictors)
+      - self.n > len(self.predictors)
+
+    >>> model = fit_multiple_regression(np.array([[1.0, 0.0], [0.0, 1.0], [1.0, 1.0],
+    ...                                           [2.0, 1.0]]),
+    ...                                 np.array([3.0, 4.0, 6.0, 8.0]))
+    >>> model.predict(np.array([[3.0, 2.0]])).round(6).tolist()
+    [13.0]
+    """
+    predictors: Tuple[str, ...]
+    intercept: float
+    coefficients: np.ndarray
+    r_squared: float
+    adjusted_r_squared: float
+    n: int
+
+    def predict(self, x: np.ndarray) -> np.ndarray:
+        """Return the predicted response for every row of x, which has one column
+        per predictor.
+        """
+        return np.asarray(x, dtype=np.float64) @ self.coefficients + self.intercept
+
+
+@instrument('multiple fit')
+def fit_multiple_regression(x: np.ndarray, y: np.ndarray,
+                            predictors: Optional[Sequence[str]] = None) \
+        -> MultipleRegressionModel:
+    """Return the least-squares multiple linear regression model of y on the columns of x.
+
+    The predictors and the response are centred, and the coefficients are then solved from
+    the QR decomposition of the centred predictors, which avoids forming the (possibly
+    ill-conditioned) normal equations.
+
+    Preconditions:
+        - x.ndim == 2 and y.ndim == 1 and x.shape[0] == y.shape[0]
+        - x.shape[0] > x.shape[1]
+        - the columns of x are linearly independent
+        - predictors is None or len(predictors) == x.shape[1]
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n, p = x.shape
+    record_rows(n)
+    if predictors is None:
+        predictors = ['x' + str(i + 1) for i in range(p)]
+
+    mean_x = x.mean(axis=0)
+    mean_y = y.mean()
+    q, r = np.linalg.qr(x - mean_x)
+    coefficients = np.linalg.solve(r, q.T @ (y - mean_y))
+    intercept = float(mean_y - mean_x @ coefficients)
+
+    residuals = y - (x @ coefficients + intercept)
+    r_squared = 1 - float(residuals @ residuals) / float((y - mean_y) @ (y - mean_y))
+    adjusted_r_squared = 1 - (1 - r_squared) * (n - 1) / (n - p - 1)
+
+    return MultipleRegressionModel(tuple(predictors), intercept, coefficients,
+                                   r_squared, adjusted_r_squared, n)
 
 
 def multiple_linear_regression(data: Dict,
                                temp: float,
-                               prec: float) -> None:
-    """Build a multiple linear regression model generated by the given data
+                               prec: float) -> MultipleRegressionModel:
+    """Build a multiple linear regression model generated by the given data, print it along
+    with its prediction for the given temperature and precipitation, and return it.
+
+    data maps the two predictor names and then the response name to their monthly values,
+    given either as lists or as columns of a MonthlyTable (see MonthlyTable.as_dict).
+    """
+    model = build_multiple_regression(data)
+    report_multiple_regression(model, temp, prec)
+    return model
+
+
+def build_multiple_regression(data: Dict) -> MultipleRegressionModel:
+    """Return the multiple linear regression model generated by the given data, and plot it.
+
+    data is laid out as in multiple_linear_regression.
     """
     keys = list(data.keys())
-    df = pd.DataFrame(data, columns=[keys[0], keys[1], keys[2]])
+    x1 = np.column_stack([data[keys[0]], data[keys[1]]])
+    y1 = np.asarray(data[keys[2]], dtype=np.float64)
+
+    model = fit_multiple_regression(x1, y1, keys[:2])
+    plot_multiple_regression(data, model.intercept, model.coefficients)
+    return model
+
+
+def report_multiple_regression(model: MultipleRegressionModel, temp: float, prec: float) -> None:
+    """Print r_squared, adjusted_r_squared, Intercept, Coefficients for the given model and
+    its predicted number of lyme cases for the given temperature and precipitation.
+    """
+    print('r_squared: \n', model.r_squared)
+    print('adjusted_r_squared: \n', model.adjusted_r_squared)
+    print('Intercept: \n', model.intercept)
+    print('Coefficients: \n', model.coefficients)
+
+    # prediction with our model
+    print('Predicted number of lyme cases: \n', model.predict(np.array([[temp, prec]])))
 
-    x1 = df[[keys[0], keys[1]]]
-    y1 = df[keys[2]]
 
-    # with sklearn
-    regr = linear_model.LinearRegression()
-    regr.fit(x1, y1)
+def plot_multiple_regression(data: Dict, intercept: float, coef: np.ndarray) -> None:
+    """Plot the given data and the multiple linear regression model in 3D using matplotlib.
 
-    r_squared = 1 - (float(sum((y1 - regr.predict(x1)) ** 2))) / sum((y1 - np.mean(y1)) ** 2)
-    adjusted_r_squared = 1 - (1 - r_squared) * (len(y1) - 1) / (len(y1) - x1.shape[1] - 1)
+    data is laid out as in multiple_linear_regression. Large clouds are thinned to at most
+    decimation.MAX_PLOT_POINTS points before they are drawn. The figure is handled by
+    rendering.render, so in 'file' mode this returns right away.
+    """
+    keys = list(data.keys())
 
-    print('r_squared: \n', r_squared)
-    print('adjusted_r_squared: \n', adjusted_r_squared)
-    print('Intercept: \n', regr.intercept_)
-    print('Coefficients: \n', regr.coef_)
+    def build() -> object:
+        # matplotlib is only imported once a plot is actually drawn
+        import matplotlib.pyplot as plt
 
-    ax = plt.figure().add_subplot(111, projection='3d')
-    ax.scatter(df['temperature'], df['precipitation'], df['disease'], c='skyblue', s=60)
-    ax.view_init(30, 185)
-    plt.xlabel(keys[0])
-    plt.ylabel(keys[1])
+        fig = plt.figure()
+        ax = fig.add_subplot(111, projection='3d')
+        points = np.column_stack([data[keys[0]], data[keys[1]], data[keys[2]]])
+        points = points[thin_points(points)]
+        ax.scatter(points[:, 0], points[:, 1], points[:, 2], c='skyblue', s=60)
+        ax.view_init(30, 185)
+        ax.set_xlabel(keys[0])
+        ax.set_ylabel(keys[1])
 
-    x = np.arange(20, 80, 1.2)
-    y = np.arange(2.5, 8.5, 0.12)
-    z = regr.coef_[0] * x + regr.coef_[1] * y + regr.intercept_
-    ax.plot3D(x, y, z, "gray")
-    plt.show()
+        x = np.arange(20, 80, 1.2)
+        y = np.arange(2.5, 8.5, 0.12)
+        z = coef[0] * x + coef[1] * y + intercept
+        ax.plot3D(x, y, z, "gray")
+        return fig
 
-    # prediction with sklearn
-    print('Predicted number of lyme cases: \n', regr.predict([[temp, prec]]))
+    render(build, keys[2] + ' multiple linear regression model')
 
 
 if __name__ == '__main__':
@@ -67,9 +174,9 @@ if __name__ == '__main__':
 
     import python_ta
     python_ta.check_all(config={
-        'extra-imports': ['pandas', 'sklearn', 'datetime', 'matplotlib.pyplot',
-                          'numpy', 'python_ta'],
-        'allowed-io': ['multiple_linear_regression'],
+        'extra-imports': ['dataclasses', 'typing', 'matplotlib.pyplot', 'numpy', 'decimation',
+                          'instrumentation', 'rendering', 'python_ta'],
+        'allowed-io': ['report_multiple_regression'],
         'max-line-length': 100,
         'disable': ['R1705', 'C0200']
     })
@@ -16,8 +16,20 @@ This file is Copyright (c) 2020 Runshi Yang, Chenxu Wang and Haojun Qiu
 """
 import datetime
 import csv
-from typing import Dict, List, Tuple
-from data_class import Climate, Disease
+import itertools
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+import dataset_cache
+from instrumentation import instrument, record_rows
+from mmwr_calendar import apportion_to_months, months_of_year, month_weight_matrix
+from data_class import Climate, Disease, MonthlyStats, MonthlyTable, ClimateTable, DiseaseTable, \
+    DiseasePanel, month_index
+
+# The names we give to climate variables whose header names differ between files
+CLIMATE_VARIABLE_NAMES = {'mean temperature': 'temperature', 'average temperature': 'temperature'}
+
+# The climate variables whose monthly value is the sum, instead of the mean, of daily values
+SUMMED_CLIMATE_VARIABLES = {'precipitation', 'snow fall'}
 
 
 ###################################################################################################
@@ -27,9 +39,9 @@ from data_class import Climate, Disease
 def temp_disease_list_2016(filepath1: str, filepath2: str) -> List[Tuple[float, float]]:
     """Return the list of tuple, each tuple stores the mean temperature
     and disease cases in that month"""
-    climate = extract_and_store_climate_data(filepath1)
+    climate = cached_climate_data(filepath1)
     temperature_list = climate.monthly_mean_temperature
-    disease = extract_and_store_disease_data(filepath2)
+    disease = cached_disease_data(filepath2)
     disease_list = disease.monthly_cases
 
     list_so_far = []
@@ -42,9 +54,9 @@ def temp_disease_list_2016(filepath1: str, filepath2: str) -> List[Tuple[float,
 def prec_disease_list_2016(filepath1: str, filepath2: str) -> List[Tuple[float, float]]:
     """Return the list of tuple, each tuple stores the mean temperature
     and disease cases in that month"""
-    climate = extract_and_store_climate_data(filepath1)
+    climate = cached_climate_data(filepath1)
     precipitation_list = climate.monthly_sum_precipitation
-    disease = extract_and_store_disease_data(filepath2)
+    disease = cached_disease_data(filepath2)
     disease_list = disease.monthly_cases
 
     list_so_far = []
@@ -57,51 +69,217 @@ def prec_disease_list_2016(filepath1: str, filepath2: str) -> List[Tuple[float,
 def temp_disease_list_2014(filepath1: str, filepath2: str) -> List[Tuple[float, float]]:
     """Return the list of tuple, each tuple stores the mean temperature
     and disease cases in that month"""
-    with open(filepath1) as file:
-        reader = csv.reader(file)
+    temperature_list = cached_weather_table(filepath1).column('temperature').tolist()
+    disease = cached_disease_data(filepath2)
+    disease_list = disease.monthly_cases
 
-        next(reader)
-        temperature_list = []
-        disease = extract_and_store_disease_data(filepath2)
-        disease_list = disease.monthly_cases
-        for row in reader:
-            list.append(temperature_list, float(row[1]))
-        list_so_far = []
-        for i in range(12):
-            list_so_far.append((temperature_list[i], disease_list[i]))
-        return list_so_far
+    list_so_far = []
+    for i in range(12):
+        list_so_far.append((temperature_list[i], disease_list[i]))
+
+    return list_so_far
 
 
 def prec_disease_list_2014(filepath1: str, filepath2: str) -> List[Tuple[float, float]]:
     """Return the list of tuple, each tuple stores the precipitation
     and disease cases in that month"""
-    with open(filepath1) as file:
-        reader = csv.reader(file)
+    precipitation_list = cached_weather_table(filepath1).column('precipitation').tolist()
+    disease = cached_disease_data(filepath2)
+    disease_list = disease.monthly_cases
 
-        next(reader)
-        temperature_list = []
-        disease = extract_and_store_disease_data(filepath2)
-        disease_list = disease.monthly_cases
-        for row in reader:
-            list.append(temperature_list, float(row[2]))
-        list_so_far = []
-        for i in range(12):
-            list_so_far.append((temperature_list[i], disease_list[i]))
-        return list_so_far
+    list_so_far = []
+    for i in range(12):
+        list_so_far.append((precipitation_list[i], disease_list[i]))
+
+    return list_so_far
 
 
 def multiple_2014_data(filepath1: str, filepath2: str) -> Dict[str, List[float]]:
     """Return the dictionary of list, each list stores the precipitation,
         temperature, and disease cases in each month in 2014"""
-    temp_disease_list = temp_disease_list_2014(filepath1, filepath2)
-    prec_disease_list = prec_disease_list_2014(filepath1, filepath2)
-    dic_so_far = {'temperature': [], 'precipitation': [], 'disease': []}
-    for i in range(12):
-        dic_so_far['temperature'].append(temp_disease_list[i][0])
-        dic_so_far['precipitation'].append((prec_disease_list[i][0]))
-        dic_so_far['disease'].append(temp_disease_list[i][1])
+    table = multiple_2014_table(filepath1, filepath2)
+    return {name: column.tolist() for name, column in table.as_dict().items()}
+
+
+###################################################################################################
+# Functions that load data into our array-backed monthly tables
+###################################################################################################
+
+def load_climate_table(filepath: str) -> ClimateTable:
+    """Return the monthly values of every climate variable stored in the
+    daily climate data of the given filepath.
+
+        Preconditions:
+            - filepath refers to a csv file in the format of
+              datasets/weather_2016.csv
+        """
+    with open(filepath) as file:
+        reader = csv.reader(file)
+        return climate_table_from_daily_rows(next(reader), reader)
 
-    return dic_so_far
+
+def load_monthly_climate_table(filepath: str) -> ClimateTable:
+    """Return the monthly values of every climate variable stored in the monthly
+    climate data of the given filepath.
+
+        Preconditions:
+            - filepath refers to a csv file in the format of
+              datasets/weather_2014.csv
+        """
+    with open(filepath) as file:
+        reader = csv.reader(file)
+        return climate_table_from_monthly_rows(next(reader), reader)
+
+
+def climate_variable_names(header: List[str]) -> List[str]:
+    """Return the names of the climate variables in the given header row, leaving out the
+    date column. The mean or average temperature is named 'temperature'.
+
+    >>> climate_variable_names(['Date', 'mean temperature', 'precipitation'])
+    ['temperature', 'precipitation']
+    """
+    return [CLIMATE_VARIABLE_NAMES.get(str.strip(name), str.strip(name)) for name in header[1:]]
+
+
+def parse_climate_value(cell: str) -> float:
+    """Return the value of a climate cell, where a trace amount 'T' counts as 0.0.
+
+    >>> parse_climate_value('T')
+    0.0
+    """
+    if cell == 'T':
+        return 0.0
+    else:
+        return float(cell)
+
+
+@instrument('parse daily climate')
+def climate_table_from_daily_rows(header: List[str], rows: Iterable[List[str]]) -> ClimateTable:
+    """Return the monthly values of every climate variable of the given daily rows, dated
+    day-month-year, in a single pass over the rows.
+
+    Precipitation and snow fall are summed over each month, and the other variables are
+    averaged over each month.
+    """
+    names = climate_variable_names(header)
+    stats_so_far = daily_climate_stats(len(names), rows)
+    record_rows(sum(stats[0].count for stats in stats_so_far.values()))
+    return climate_table_from_stats(names, stats_so_far)
+
+
+def daily_climate_stats(variables: int, rows: Iterable[List[str]]) \
+        -> Dict[Tuple[int, int], List[MonthlyStats]]:
+    """Return the summary of each of the given number of climate variables in each
+    (year, month) of the given daily rows, dated day-month-year, in a single pass.
+
+    >>> stats = daily_climate_stats(1, [['1-1-2016', '2'], ['2-1-2016', 'T']])
+    >>> stats[(2016, 1)][0].count, stats[(2016, 1)][0].total
+    (2, 2.0)
+    """
+    # Accumulator mapping (year, month) to the summary of each variable in that month
+    stats_so_far = {}
+    for row in rows:
+        date = str_to_date(row[0])
+        key = (date.year, date.month)
+        if key not in stats_so_far:
+            stats_so_far[key] = [MonthlyStats() for _ in range(variables)]
+        for stats, cell in zip(stats_so_far[key], row[1:]):
+            stats.add(parse_climate_value(cell))
+    return stats_so_far
+
+
+def climate_table_from_stats(names: List[str],
+                             stats: Dict[Tuple[int, int], List[MonthlyStats]]) -> ClimateTable:
+    """Return the monthly values of the climate variables with the given names, from the
+    summary of each variable in each (year, month).
+
+    Precipitation and snow fall are summed over each month, and the other variables are
+    averaged over each month.
+    """
+    keys = sorted(stats)
+    months = [month_index(key[0], key[1]) for key in keys]
+    values = [[month.total if name in SUMMED_CLIMATE_VARIABLES else month.mean()
+               for name, month in zip(names, stats[key])] for key in keys]
+    return ClimateTable(months, names, values)
+
+
+@instrument('parse monthly climate', rows=len)
+def climate_table_from_monthly_rows(header: List[str],
+                                    rows: Iterable[List[str]]) -> ClimateTable:
+    """Return the monthly values of every climate variable of the given monthly rows,
+    dated YYYYMM.
+    """
+    months = []
+    values = []
+    for row in rows:
+        list.append(months, month_index(int(row[0][:4]), int(row[0][4:])))
+        list.append(values, [parse_climate_value(cell) for cell in row[1:]])
+
+    return ClimateTable(months, climate_variable_names(header), values)
+
+
+def load_weather_table(filepath: str) -> ClimateTable:
+    """Return the monthly values of every climate variable stored in the given filepath,
+    which may hold either monthly rows (like datasets/weather_2014.csv) or daily rows
+    (like datasets/weather_2016.csv). The file is read once.
+    """
+    with open(filepath) as file:
+        reader = csv.reader(file)
+
+        header = next(reader)
+        first_row = next(reader)
+        rows = itertools.chain([first_row], reader)
+
+        # Daily rows are dated day-month-year, monthly rows are dated YYYYMM
+        if '-' in first_row[0]:
+            return climate_table_from_daily_rows(header, rows)
+        else:
+            return climate_table_from_monthly_rows(header, rows)
+
+
+def load_monthly_table(weather_filepath: str, disease_filepath: str,
+                       area: Optional[str] = None) -> MonthlyTable:
+    """Return a table with every climate variable of weather_filepath followed by the cases
+    of every disease of disease_filepath in the given area, for each month present in both.
+
+    The weather file may hold monthly or daily rows, and both files may span any number of
+    years. Each file is read exactly once. area defaults to the first reporting area
+    of the disease file.
+    """
+    climate = load_weather_table(weather_filepath)
+    panel = load_disease_panel(disease_filepath)
+    if area is None:
+        area = panel.areas[0]
+    return climate.join(load_disease_panel_table(panel, area, list(panel.diseases)))
+
+
+@instrument('apportion weeks to months')
+def load_disease_panel_table(panel: DiseasePanel, area: str,
+                             diseases: List[str]) -> DiseaseTable:
+    """Return the monthly cases of the given diseases in the given area of panel, for every
+    month touched by the weeks of the panel.
+
+    Preconditions:
+        - area in panel.areas
+        - all(disease in panel.diseases for disease in diseases)
+    """
+    keys, weights = month_weight_matrix(list(panel.weeks))
+    weekly_cases = panel.cases[panel.areas.index(area),
+                               [panel.diseases.index(disease) for disease in diseases]]
+
+    months = [month_index(key[0], key[1]) for key in keys]
+    return DiseaseTable(months, diseases, (weekly_cases @ weights).T)
+
+
+def multiple_2014_table(filepath1: str, filepath2: str) -> MonthlyTable:
+    """Return the table of temperature, precipitation, and disease cases in each month in 2014,
+    with the same columns as multiple_2014_data.
+    """
+    panel = cached_disease_panel(filepath2)
+    table = cached_weather_table(filepath1).join(
+        load_disease_panel_table(panel, panel.areas[0], list(panel.diseases)))
+    return MonthlyTable(table.months, ['temperature', 'precipitation', 'disease'],
+                        table.select(['temperature', 'precipitation', 'Lyme disease']))
 
 
 ###################################################################################################
@@ -113,6 +291,30 @@ def extract_and_store_climate_data(filepath: str) -> Climate:
     """Extract United States climate data from the given filepath and transform it
     into Climate datatype.
 
+        Preconditions:
+            - filepath refers to a csv file in the format of
+              datasets/weather_data_2016.csv
+        """
+    monthly_temps, monthly_precs = aggregate_climate_data(filepath)
+
+    # Calculate monthly mean temperature and monthly sum precipitation, in calendar order
+    monthly_mean_temps = [monthly_temps[key].mean() for key in sorted(monthly_temps)]
+    monthly_sum_precs = [monthly_precs[key].total for key in sorted(monthly_precs)]
+
+    # Store two "monthly lists" into an empty Climate(our custom dataclass),
+    # and we are done with our extraction!
+    climate_data = Climate(monthly_sum_precipitation=monthly_sum_precs,
+                           monthly_mean_temperature=monthly_mean_temps)
+
+    return climate_data
+
+
+@instrument('aggregate daily climate')
+def aggregate_climate_data(filepath: str) -> Tuple[Dict[Tuple[int, int], MonthlyStats],
+                                                   Dict[Tuple[int, int], MonthlyStats]]:
+    """Read the daily climate data from the given filepath in a single pass, and return
+    the (year, month) summaries of daily temperature and daily precipitation.
+
         Preconditions:
             - filepath refers to a csv file in the format of
               datasets/weather_data_2016.csv
@@ -123,150 +325,191 @@ def extract_and_store_climate_data(filepath: str) -> Climate:
         # Skip header row
         next(reader)
 
-        # Set accumulators that store key value pairs, where key represents date,
-        # and the corresponding value represent temperature or precipitation in that date
-        daily_temperature = {}
-        daily_precipitation = {}
+        # Set accumulators that store key value pairs, where key represents (year, month),
+        # and the corresponding value summarizes temperature or precipitation in that month
+        monthly_temps = {}
+        monthly_precs = {}
 
         for row in reader:
             date = str_to_date(row[0])
+            key = (date.year, date.month)
 
             # 1. Extract temperature from raw data
-            daily_temperature[date] = float(row[3])
+            if key not in monthly_temps:
+                monthly_temps[key] = MonthlyStats()
+            monthly_temps[key].add(float(row[3]))
 
             # 2. Extract precipitation from raw data
+            if key not in monthly_precs:
+                monthly_precs[key] = MonthlyStats()
             if row[-3] == 'T':
-                daily_precipitation[date] = 0.0
+                monthly_precs[key].add(0.0)
             else:  # when row[-3] != 0
-                daily_precipitation[date] = float(row[-3])
-
-        monthly_temps = convert_daily_temp_or_prec(daily_temperature)  # Group daily temp by month
-        monthly_precs = convert_daily_temp_or_prec(daily_precipitation)  # Group daily prec by month
+                monthly_precs[key].add(float(row[-3]))
 
-        # Calculate monthly mean temperature, storing into a list
-        monthly_mean_temps = []
-        for monthly_temp in monthly_temps:
-            mean_temp_this_month = sum(monthly_temp) / len(monthly_temp)
-            list.append(monthly_mean_temps, mean_temp_this_month)
-
-        # Calculate monthly sum precipitation, storing into a list
-        monthly_sum_precs = [sum(monthly_prec) for monthly_prec in monthly_precs]
-
-        # Store two "monthly lists" into an empty Climate(our custom dataclass),
-        # and we are done with our extraction!
-        climate_data = Climate(monthly_sum_precipitation=monthly_sum_precs,
-                               monthly_mean_temperature=monthly_mean_temps)
-
-        return climate_data
+        record_rows(sum(stats.count for stats in monthly_temps.values()))
+        return (monthly_temps, monthly_precs)
 
 
 def extract_and_store_disease_data(filepath: str) -> Disease:
     """Read the disease data from the given filepath and transform into a list of
-    monthly disease cases
+    monthly disease cases, for the twelve months of the file's MMWR year.
+
+    Cases of weeks that overlap the neighbouring calendar years are only counted
+    in the months of the MMWR year.
 
         Preconditions:
             - filepath refers to a csv file in the format of
               datasets/disease_2016.csv
         """
-    # Transform weekly cases into daily cases, and group them in month.
-    disease_daily = convert_csv_disease_data(filepath)
-    cases_in_month = convert_disease(apply_date_time(disease_daily))
-
-    # Set accumulator, for storing sum of cases in month
-    monthly_disease_data = []
-
-    # Sum up newly cases of each month, and store into a list
-    for cases in cases_in_month:
-        disease_this_month = sum(cases)
-        list.append(monthly_disease_data, disease_this_month)
+    # Spread the weekly cases over the calendar months of the MMWR year
+    weekly_cases = read_weekly_disease_data(filepath)
+    monthly_cases = apportion_to_months(weekly_cases)
+    monthly_disease_data = months_of_year(monthly_cases, weekly_cases[0][0])
 
     # Store the cases list into out custom datatype —— Disease
     disease_data = Disease(disease_name='lyme', monthly_cases=monthly_disease_data)
     return disease_data
 
 
-def str_to_date(date_string: str) -> datetime.date:
-    """Convert a string in day-month-year format to a datetime.date.
+def cached_climate_data(filepath: str) -> Climate:
+    """Return the same Climate as extract_and_store_climate_data(filepath), reading it from
+    the on-disk dataset cache when the file has not changed since it was last parsed.
+    """
+    def parse() -> Dict[str, np.ndarray]:
+        climate = extract_and_store_climate_data(filepath)
+        return {'monthly_mean_temperature': np.array(climate.monthly_mean_temperature),
+                'monthly_sum_precipitation': np.array(climate.monthly_sum_precipitation)}
 
-    Preconditions:
-    - date_string has format day-month-year
+    arrays = dataset_cache.load_or_compute(filepath, 'climate', parse)
+    return Climate(monthly_mean_temperature=arrays['monthly_mean_temperature'].tolist(),
+                   monthly_sum_precipitation=arrays['monthly_sum_precipitation'].tolist())
 
-    >>> str_to_date('1-1-2016')
-    datetime.date(2016, 1, 1)
+
+def cached_disease_data(filepath: str) -> Disease:
+    """Return the same Disease as extract_and_store_disease_data(filepath), reading it from
+    the on-disk dataset cache when the file has not changed since it was last parsed.
     """
-    time = str.split(date_string, '-')
-    return datetime.date(int(time[2]), int(time[1]), int(time[0]))
+    def parse() -> Dict[str, np.ndarray]:
+        disease = extract_and_store_disease_data(filepath)
+        return {'disease_name': np.array(disease.disease_name),
+                'monthly_cases': np.array(disease.monthly_cases)}
+
+    arrays = dataset_cache.load_or_compute(filepath, 'disease', parse)
+    return Disease(disease_name=str(arrays['disease_name']),
+                   monthly_cases=arrays['monthly_cases'].tolist())
 
 
-def convert_csv_disease_data(filepath: str) -> List[float]:
-    """read the weekly lyme disease data from the given filepath and transform into a list of
-       the number of daily disease cases
-       (we will assume the cases to be float to ensure its accuracy).
+def cached_weather_table(filepath: str) -> ClimateTable:
+    """Return the same table as load_weather_table(filepath), reading it from the on-disk
+    dataset cache when the file has not changed since it was last parsed.
+    """
+    def parse() -> Dict[str, np.ndarray]:
+        table = load_weather_table(filepath)
+        return {'months': table.months, 'names': np.array(table.names, dtype=str),
+                'values': table.values}
+
+    arrays = dataset_cache.load_or_compute(filepath, 'weather table', parse)
+    return ClimateTable(arrays['months'], arrays['names'].tolist(), arrays['values'])
 
 
-            Preconditions:
-                - filepath refers to a csv file in the format of
-                    datasets/disease_2016.csv
+def cached_disease_panel(filepath: str) -> DiseasePanel:
+    """Return the same panel as load_disease_panel(filepath), reading it from the on-disk
+    dataset cache when the file has not changed since it was last parsed.
     """
-    with open(filepath) as file:
-        reader = csv.reader(file)
+    def parse() -> Dict[str, np.ndarray]:
+        panel = load_disease_panel(filepath)
+        return {'areas': np.array(panel.areas, dtype=str),
+                'diseases': np.array(panel.diseases, dtype=str),
+                'weeks': np.array(panel.weeks, dtype=np.int64).reshape(len(panel.weeks), 2),
+                'cases': panel.cases}
 
-        next(reader)
-        disease_so_far = []
+    arrays = dataset_cache.load_or_compute(filepath, 'disease panel', parse)
+    return DiseasePanel(arrays['areas'].tolist(), arrays['diseases'].tolist(),
+                        [tuple(week) for week in arrays['weeks'].tolist()], arrays['cases'])
 
-        for row in reader:
-            for _ in range(0, 7):
-                list.append(disease_so_far, int(row[3]) / 7)
-        return disease_so_far
 
+@instrument('parse disease panel')
+def load_disease_panel(filepath: str, missing: float = 0.0) -> DiseasePanel:
+    """Read the weekly cases of every reporting area and every disease column from the given
+    filepath in a single pass, and return them as a DiseasePanel.
 
-def apply_date_time(disease_data: List[float]) -> Dict[datetime.date, float]:
-    """ apply the datetime value for the daily disease_data in 2016(assume you already have weather
-    data installed and have file path 'datasets/weather_data_nyc_centralpark_2016.csv')
+    Blank cells (such as weeks without any reported malaria case) are stored as missing.
+    Weeks that do not appear for some area are also stored as missing.
 
+        Preconditions:
+            - filepath refers to a csv file in the format of
+              datasets/disease_2016.csv
     """
-    with open('datasets/weather_2016.csv') as file:
+    with open(filepath) as file:
         reader = csv.reader(file)
 
-        next(reader)
-        date_so_far = []
-        dict_so_far = {}
+        # Disease columns are named like 'Lyme disease, Current week'
+        header = next(reader)
+        diseases = [str.split(column, ',')[0] for column in header[3:]]
+
+        # Accumulator mapping (area, (year, week)) to the cases of each disease that week
+        rows_so_far = {}
         for row in reader:
-            list.append(date_so_far, str_to_date(row[0]))
-        for i in range(0, len(disease_data)):
-            dict_so_far[date_so_far[i]] = disease_data[i]
+            week = (int(row[1]), int(row[2]))
+            rows_so_far[(row[0], week)] = [float(cell) if cell != '' else missing
+                                           for cell in row[3:3 + len(diseases)]]
+
+    record_rows(len(rows_so_far))
+    areas = sorted({key[0] for key in rows_so_far})
+    weeks = sorted({key[1] for key in rows_so_far})
+    area_positions = {area: i for i, area in enumerate(areas)}
+    week_positions = {week: i for i, week in enumerate(weeks)}
+
+    cases = np.full((len(areas), len(diseases), len(weeks)), missing)
+    for (area, week), values in rows_so_far.items():
+        cases[area_positions[area], :, week_positions[week]] = values
 
-        return dict_so_far
+    return DiseasePanel(areas, diseases, weeks, cases)
 
 
-def convert_daily_temp_or_prec(daily_temperature: Dict[datetime.date, float]) -> List[list]:
-    """convert the given dictionary of daily temperature into lists of temperature
-    separated by month.
+def extract_disease_from_panel(panel: DiseasePanel, area: str, disease: str) -> Disease:
+    """Return the monthly cases of the given disease in the given area of panel, computed in
+    the same way as extract_and_store_disease_data.
 
+    Preconditions:
+        - area in panel.areas
+        - disease in panel.diseases
     """
-    month_temp_so_far = []
-    for i in range(1, 13):
-        temp_this_month = []
-        for date in daily_temperature:
-            if date.month == i:
-                list.append(temp_this_month, daily_temperature[date])
-        list.append(month_temp_so_far, temp_this_month)
-    return month_temp_so_far
+    weekly_cases = [(week[0], week[1], cases) for week, cases in
+                    zip(panel.weeks, panel.series(area, disease).tolist())]
+    monthly_disease_data = months_of_year(apportion_to_months(weekly_cases), panel.weeks[0][0])
+    return Disease(disease_name=disease, monthly_cases=monthly_disease_data)
 
 
-def convert_disease(daily_disease: Dict[datetime.date, float]) -> List[list]:
-    """Convert the given dictionary of weekly disease cases into lists containing
-    lists each represents the monthly added cases
+@instrument('date conversion', memory=False)
+def str_to_date(date_string: str) -> datetime.date:
+    """Convert a string in day-month-year format to a datetime.date.
 
+    Preconditions:
+    - date_string has format day-month-year
+
+    >>> str_to_date('1-1-2016')
+    datetime.date(2016, 1, 1)
     """
-    month_disease_so_far = []
-    for i in range(1, 13):
-        disease_this_month = []
-        for date in daily_disease:
-            if date.month == i:
-                list.append(disease_this_month, daily_disease[date])
-        list.append(month_disease_so_far, disease_this_month)
-    return month_disease_so_far
+    time = str.split(date_string, '-')
+    return datetime.date(int(time[2]), int(time[1]), int(time[0]))
+
+
+@instrument('parse weekly disease', rows=len)
+def read_weekly_disease_data(filepath: str) -> List[Tuple[int, int, float]]:
+    """Read the weekly lyme disease data from the given filepath, returning the
+    (MMWR year, MMWR week, cases) of each row.
+
+        Preconditions:
+            - filepath refers to a csv file in the format of
+              datasets/disease_2016.csv
+    """
+    with open(filepath) as file:
+        reader = csv.reader(file)
+
+        next(reader)
+        return [(int(row[1]), int(row[2]), float(row[3])) for row in reader]
 
 
 if __name__ == '__main__':
@@ -276,10 +519,12 @@ if __name__ == '__main__':
 
     import python_ta
     python_ta.check_all(config={
-        'extra-imports': ['csv', 'datetime', 'typing', 'python_ta', 'data_class'],
+        'extra-imports': ['csv', 'datetime', 'itertools', 'typing', 'numpy', 'python_ta',
+                          'data_class', 'dataset_cache', 'instrumentation', 'mmwr_calendar'],
         'allowed-io': ['temp_disease_list_2014', 'temp_disease_list_2016', 'prec_disease_list_2014',
-                       'prec_disease_list_2016', 'multiple_2014_data', 'apply_date_time',
-                       'convert_csv_disease_data', 'extract_and_store_climate_data'],
+                       'prec_disease_list_2016', 'multiple_2014_data', 'aggregate_climate_data',
+                       'load_monthly_climate_table', 'load_disease_panel',
+                       'load_weather_table', 'read_weekly_disease_data', 'load_climate_table'],
         'max-line-length': 100,
         'disable': ['R1705', 'C0200']
     })
@@ -0,0 +1,171 @@
+"""CSC110 final project, main module
+
+Descriptions
+===============================
+
+This module decides what happens to the plots drawn by our regression functions.
+
+There are three rendering modes:
+  - 'show': draw each plot and display it right away (in a web browser or a window),
+    which blocks until it is displayed
+  - 'file': queue each plot to a background worker, which draws it and writes it to a file
+    in the output directory (.html for plotly figures, .png for matplotlib figures),
+    so the caller returns right away
+  - 'off': skip plotting entirely
+
+The initial mode is read from the PLOT_MODE environment variable, and is 'show' by default.
+Choosing a mode does not import matplotlib: in 'file' mode, the worker switches matplotlib
+to its display-free Agg backend right before it draws its first plot.
+
+Copyright and Usage Information
+===============================
+
+All forms of distribution of this code, whether as given or with any changes, are
+expressly prohibited. All rights reserved.
+
+This file is Copyright (c) 2020 Runshi Yang, Chenxu Wang and Haojun Qiu
+"""
+import atexit
+import os
+import queue
+import re
+import threading
+import traceback
+from typing import Any, Callable, Optional
+from instrumentation import stage
+
+RENDER_MODES = ('show', 'file', 'off')
+
+# The current rendering mode, and the directory plots are written to in 'file' mode
+render_mode = 'show'
+output_dir = 'plots'
+
+# Plots waiting to be drawn by the background worker, as (build, name) pairs
+plot_queue = queue.Queue()
+worker: Optional[threading.Thread] = None
+
+# Whether matplotlib has been switched to the Agg backend by the background worker
+headless = False
+
+
+def set_render_mode(mode: str, directory: str = 'plots') -> None:
+    """Set the rendering mode, and the directory plots are written to in 'file' mode.
+
+    Preconditions:
+        - mode in RENDER_MODES
+    """
+    global render_mode, output_dir
+
+    render_mode = mode
+    output_dir = directory
+
+
+def render(build: Callable[[], Any], name: str) -> None:
+    """Render the figure returned by build according to the current rendering mode.
+
+    build returns either a plotly figure or a matplotlib figure. name identifies the plot,
+    and is used for its file name in 'file' mode.
+    """
+    if render_mode == 'off':
+        return
+    elif render_mode == 'file':
+        start_worker()
+        plot_queue.put((build, name))
+    else:
+        with stage('plot'):
+            figure = build()
+            if hasattr(figure, 'write_html'):
+                figure.show()
+            else:
+                import matplotlib.pyplot as plt
+                plt.show()
+
+
+def write_figure(figure: Any, name: str) -> str:
+    """Write the given plotly or matplotlib figure to a file in the output directory,
+    and return the path of that file.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    if hasattr(figure, 'write_html'):
+        path = os.path.join(output_dir, file_name(name) + '.html')
+        # plotly.js is written once to the output directory and shared by every plot,
+        # instead of being embedded in each file
+        figure.write_html(path, include_plotlyjs='directory')
+    else:
+        import matplotlib.pyplot as plt
+        path = os.path.join(output_dir, file_name(name) + '.png')
+        figure.savefig(path)
+        plt.close(figure)
+    return path
+
+
+def file_name(name: str) -> str:
+    """Return the given plot name with every run of characters that are unsafe in
+    file names replaced by an underscore.
+
+    >>> file_name('prediction by temperature-lyme model')
+    'prediction_by_temperature-lyme_model'
+    """
+    return re.sub(r'[^A-Za-z0-9.-]+', '_', name).strip('_')
+
+
+def start_worker() -> None:
+    """Start the background worker that draws the queued plots, unless it is running."""
+    global worker
+
+    if worker is None or not worker.is_alive():
+        worker = threading.Thread(target=run_worker, daemon=True)
+        worker.start()
+
+
+def use_headless_backend() -> None:
+    """Switch matplotlib to the Agg backend, which draws without a display, so figures can
+    be drawn off the main thread. matplotlib is only imported the first time this is called.
+    """
+    global headless
+
+    if not headless:
+        import matplotlib
+        matplotlib.use('Agg')
+        headless = True
+
+
+def run_worker() -> None:
+    """Draw and write the queued plots one at a time, forever."""
+    while True:
+        build, name = plot_queue.get()
+        try:
+            with stage('plot'):
+                use_headless_backend()
+                write_figure(build(), name)
+        except Exception:  # a broken plot must not stop the ones queued after it
+            traceback.print_exc()
+        finally:
+            plot_queue.task_done()
+
+
+def wait() -> None:
+    """Wait until every queued plot has been written."""
+    plot_queue.join()
+
+
+set_render_mode(os.environ.get('PLOT_MODE', 'show'), os.environ.get('PLOT_DIR', 'plots'))
+
+# Make sure queued plots are written before the program exits
+atexit.register(wait)
+
+
+if __name__ == '__main__':
+    import doctest
+
+    doctest.testmod(verbose=True)
+
+    import python_ta
+    python_ta.check_all(config={
+        'extra-imports': ['atexit', 'os', 'queue', 're', 'threading', 'traceback',
+                          'typing', 'instrumentation', 'matplotlib', 'matplotlib.pyplot',
+                          'python_ta'],
+        'allowed-io': [],
+        'max-line-length': 100,
+        'disable': ['R1705', 'C0200', 'W0603']
+    })
@@ -0,0 +1,269 @@
+"""CSC110 final project, main module
+
+Descriptions
+===============================
+
+This module estimates the uncertainty of our simple and multiple linear regression
+models, with bootstrap confidence intervals and k-fold or leave-one-out cross-validation.
+
+Both are computed as many weighted least-squares fits of the same data at once: a
+bootstrap resample weighs each observation by the number of times it was drawn, and a
+cross-validation fold weighs its training observations by 1 and its test observations
+by 0. All the fits are then solved in one batched NumPy pass instead of a Python loop.
+
+Each fit is solved from its weighted Gram matrix, which only has a row and a column per
+predictor, so a batch of fits takes memory for its weights and not for a copy of the data
+per fit. Bootstrap resamples are drawn in chunks small enough that the weights of a chunk
+stay within CHUNK_BYTES, however many observations there are.
+
+Copyright and Usage Information
+===============================
+
+All forms of distribution of this code, whether as given or with any changes, are
+expressly prohibited. All rights reserved.
+
+This file is Copyright (c) 2020 Runshi Yang, Chenxu Wang and Haojun Qiu
+"""
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Optional, Tuple
+import numpy as np
+
+# The most bootstrap resamples drawn and fitted together
+CHUNK_SIZE = 1000
+
+# The most bytes of resample weights (and their temporaries) in a chunk of resamples
+CHUNK_BYTES = 64 * 1024 * 1024
+
+
+@dataclass
+class BootstrapResult:
+    """The models fitted on each bootstrap resample of some data.
+
+    Instance Attributes:
+      - intercepts: the intercept fitted on each resample
+      - coefficients: the coefficients fitted on each resample, one row per resample
+      - r_squared: the R squared value of the model fitted on each resample
+
+    Representation Invariants:
+      - len(self.intercepts) == len(self.coefficients) == len(self.r_squared)
+    """
+    intercepts: np.ndarray
+    coefficients: np.ndarray
+    r_squared: np.ndarray
+
+    def intercept_interval(self, confidence: float = 0.95) -> Tuple[float, float]:
+        """Return the percentile bootstrap confidence interval of the intercept."""
+        return tuple(percentile_interval(self.intercepts, confidence).tolist())
+
+    def coefficient_intervals(self, confidence: float = 0.95) -> np.ndarray:
+        """Return the percentile bootstrap confidence interval of each coefficient, as an
+        array with one (low, high) row per predictor."""
+        return percentile_interval(self.coefficients, confidence).T
+
+    def r_squared_interval(self, confidence: float = 0.95) -> Tuple[float, float]:
+        """Return the percentile bootstrap confidence interval of the R squared value."""
+        return tuple(percentile_interval(self.r_squared, confidence).tolist())
+
+
+@dataclass
+class CrossValidationResult:
+    """The out-of-sample performance of a model, estimated by cross-validation.
+
+    Instance Attributes:
+      - folds: the number of folds (equal to the number of observations for leave-one-out)
+      - predictions: the prediction of each observation by the model fitted without its fold
+      - mse: the mean squared error of the predictions
+      - r_squared: the R squared value of the predictions
+
+    Representation Invariants:
+      - self.folds >= 2
+    """
+    folds: int
+    predictions: np.ndarray
+    mse: float
+    r_squared: float
+
+
+def percentile_interval(values: np.ndarray, confidence: float) -> np.ndarray:
+    """Return the lower and upper percentiles of values along the first axis that enclose
+    the given confidence level.
+
+    >>> percentile_interval(np.arange(101.0), 0.9).round(6).tolist()
+    [5.0, 95.0]
+    """
+    tail = (1 - confidence) / 2
+    return np.quantile(values, [tail, 1 - tail], axis=0)
+
+
+def as_predictors(x: np.ndarray) -> np.ndarray:
+    """Return x as a 2-D float array with one column per predictor, so that a single
+    predictor can be given as a 1-D array."""
+    x = np.asarray(x, dtype=np.float64)
+    return x[:, np.newaxis] if x.ndim == 1 else x
+
+
+def weighted_fits(x: np.ndarray, y: np.ndarray,
+                  weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Return the (intercepts, coefficients, r_squared) of the least-squares regressions of
+    y on the columns of x, one for each row of weights.
+
+    Row i of weights gives the weight of each observation in fit i; observations with
+    weight 0 are left out, and an integer weight counts an observation that many times.
+
+    Preconditions:
+        - x.ndim == 2 and y.shape == (x.shape[0],)
+        - weights.ndim == 2 and weights.shape[1] == x.shape[0]
+        - every fit has linearly independent predictors
+
+    >>> intercepts, coefficients, _ = weighted_fits(np.array([[1.0], [2.0], [3.0], [4.0]]),
+    ...                                             np.array([2.0, 4.0, 6.0, 0.0]),
+    ...                                             np.array([[1.0, 1.0, 1.0, 0.0]]))
+    >>> intercepts.round(6).tolist(), coefficients.round(6).tolist()
+    ([0.0], [[2.0]])
+    """
+    # Standardize the data, so that the Gram matrices are well conditioned, and lay it out
+    # as a = [1, x, y]
+    scale_x = x.std(axis=0)
+    scale_x[scale_x == 0] = 1.0
+    scale_y = float(y.std()) or 1.0
+    a = np.column_stack((np.ones(len(y)), (x - x.mean(axis=0)) / scale_x,
+                         (y - y.mean()) / scale_y))
+
+    # grams[b] is the Gram matrix of a with its rows weighted by weights[b], built one
+    # column at a time so that no array is larger than weights
+    grams = np.empty((len(weights), a.shape[1], a.shape[1]))
+    for j in range(a.shape[1]):
+        grams[:, :, j] = (weights * a[:, j]) @ a
+
+    # Solve the normal equations of [1, x] against y, for every fit at once
+    predictors = a.shape[1] - 1
+    targets = grams[:, :predictors, predictors]
+    solutions = np.linalg.solve(grams[:, :predictors, :predictors],
+                                targets[:, :, np.newaxis])[:, :, 0]
+
+    # Undo the standardization
+    coefficients = solutions[:, 1:] * scale_y / scale_x
+    intercepts = y.mean() + scale_y * solutions[:, 0] - coefficients @ x.mean(axis=0)
+
+    # The weighted residual and total sums of squares, in standardized units
+    sse = grams[:, predictors, predictors] - np.sum(solutions * targets, axis=1)
+    sst = grams[:, predictors, predictors] - grams[:, 0, predictors] ** 2 / grams[:, 0, 0]
+    return (intercepts, coefficients, 1 - sse / sst)
+
+
+def chunk_size(n: int) -> int:
+    """Return the number of bootstrap resamples of n observations drawn and fitted together:
+    at most CHUNK_SIZE, and few enough that their weights stay within CHUNK_BYTES.
+
+    >>> chunk_size(12), chunk_size(100_000)
+    (1000, 27)
+    """
+    # A chunk holds the count of each observation in each resample (as an integer and as a
+    # float weight), and a weighted copy of one column of the data while the Gram
+    # matrices are built
+    return max(1, min(CHUNK_SIZE, CHUNK_BYTES // (24 * n)))
+
+
+def bootstrap_chunk(x: np.ndarray, y: np.ndarray, seed: np.random.SeedSequence,
+                    resamples: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Draw the given number of bootstrap resamples of the observations with a generator
+    seeded by seed, and return the (intercepts, coefficients, r_squared) fitted on each."""
+    n = len(y)
+    counts = np.random.default_rng(seed).multinomial(n, np.full(n, 1 / n), size=resamples)
+    return weighted_fits(x, y, counts.astype(np.float64))
+
+
+def bootstrap(x: np.ndarray, y: np.ndarray, resamples: int = 1000, seed: int = 0,
+              max_workers: int = 1) -> BootstrapResult:
+    """Fit the linear regression of y on x to the given number of bootstrap resamples of the
+    observations, and return the fitted models.
+
+    x is a 1-D array for the simple model, or a 2-D array with one column per predictor for
+    the multiple model. The resamples are drawn in chunks of chunk_size(len(y)), each from
+    its own generator derived from seed, so the result only depends on seed, resamples and
+    the number of observations. With max_workers > 1, the chunks are spread over that many
+    processes.
+
+    Preconditions:
+        - len(y) == len(x) > number of predictors + 1
+        - resamples > 0 and max_workers > 0
+
+    >>> x = np.arange(12.0)
+    >>> result = bootstrap(x, 2 * x + 1 + np.sin(x), resamples=500, seed=1)
+    >>> low, high = result.coefficient_intervals()[0]
+    >>> bool(low < 2 < high)
+    True
+    """
+    x = as_predictors(x)
+    y = np.asarray(y, dtype=np.float64)
+
+    size = chunk_size(len(y))
+    sizes = [size] * (resamples // size)
+    if resamples % size != 0:
+        list.append(sizes, resamples % size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    if max_workers == 1:
+        chunks = list(map(bootstrap_chunk, itertools.repeat(x), itertools.repeat(y),
+                          seeds, sizes))
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            chunks = list(executor.map(bootstrap_chunk, itertools.repeat(x),
+                                       itertools.repeat(y), seeds, sizes))
+
+    return BootstrapResult(np.concatenate([chunk[0] for chunk in chunks]),
+                           np.concatenate([chunk[1] for chunk in chunks]),
+                           np.concatenate([chunk[2] for chunk in chunks]))
+
+
+def cross_validate(x: np.ndarray, y: np.ndarray, folds: Optional[int] = 5,
+                   seed: int = 0) -> CrossValidationResult:
+    """Return the k-fold cross-validated performance of the linear regression of y on x, or
+    the leave-one-out performance when folds is None.
+
+    x is laid out as in bootstrap. The observations are assigned to folds at random,
+    using a generator seeded by seed, and every fold is fitted at once.
+
+    Preconditions:
+        - len(y) == len(x)
+        - folds is None or 2 <= folds <= len(y)
+        - every training set has more observations than predictors + 1
+
+    >>> x = np.arange(12.0)
+    >>> result = cross_validate(x, 3 * x - 2, folds=None)
+    >>> result.folds, round(result.mse, 6), round(result.r_squared, 6)
+    (12, 0.0, 1.0)
+    """
+    x = as_predictors(x)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    folds = n if folds is None else folds
+
+    # fold_of[i] is the fold of observation i, with fold sizes differing by at most one
+    fold_of = np.random.default_rng(seed).permutation(np.arange(n) % folds)
+    test = fold_of[np.newaxis, :] == np.arange(folds)[:, np.newaxis]
+
+    intercepts, coefficients, _ = weighted_fits(x, y, (~test).astype(np.float64))
+
+    # Each observation is predicted by the model of the fold it was left out of
+    predictions = intercepts[fold_of] + np.sum(x * coefficients[fold_of], axis=1)
+    sse = float(np.sum((y - predictions) ** 2))
+    return CrossValidationResult(folds, predictions, sse / n,
+                                 1 - sse / float(np.sum((y - y.mean()) ** 2)))
+
+
+if __name__ == '__main__':
+    import doctest
+
+    doctest.testmod(verbose=True)
+
+    import python_ta
+    python_ta.check_all(config={
+        'extra-imports': ['itertools', 'concurrent.futures', 'dataclasses', 'typing', 'numpy',
+                          'python_ta'],
+        'allowed-io': [],
+        'max-line-length': 100,
+        'disable': ['R1705', 'C0200']
+    })
@@ -0,0 +1,214 @@
+"""CSC110 final project, main module
+
+Descriptions
+===============================
+
+This module fits our simple and multiple linear regression models over rolling
+(fixed-length) or expanding windows of long monthly histories, giving the
+trajectories of their coefficients and R squared values.
+
+Instead of refitting every window from scratch, each window's sums of squares and
+products are the difference of two cumulative sums, so every additional window costs
+O(1) for the simple model and O(p^3) for a multiple model with p predictors, no matter
+how long the window is. The data is centred on its overall means first, so the
+cumulative sums do not lose precision on long histories.
+
+Copyright and Usage Information
+===============================
+
+All forms of distribution of this code, whether as given or with any changes, are
+expressly prohibited. All rights reserved.
+
+This file is Copyright (c) 2020 Runshi Yang, Chenxu Wang and Haojun Qiu
+"""
+from dataclasses import dataclass
+from typing import Optional, Tuple
+import numpy as np
+from multiple_regression import MultipleRegressionModel
+
+
+@dataclass
+class RollingFit:
+    """The regression models fitted on a sequence of windows of a history.
+
+    Window i covers the observations starts[i] (inclusive) to ends[i] (exclusive). Any
+    leading axes of the fitted arrays are the series the history was made of.
+
+    Instance Attributes:
+      - starts: the first observation of each window
+      - ends: one past the last observation of each window
+      - intercepts: the intercept of each window's model, with shape (..., windows)
+      - coefficients: the coefficients of each window's model, with shape
+        (..., windows, predictors)
+      - r_squared: the R squared value of each window's model, with shape (..., windows)
+
+    Representation Invariants:
+      - len(self.starts) == len(self.ends) == self.intercepts.shape[-1]
+      - all(self.starts < self.ends)
+    """
+    starts: np.ndarray
+    ends: np.ndarray
+    intercepts: np.ndarray
+    coefficients: np.ndarray
+    r_squared: np.ndarray
+
+    def adjusted_r_squared(self) -> np.ndarray:
+        """Return the R squared value of each window's model adjusted for the number
+        of predictors."""
+        n = self.ends - self.starts
+        p = self.coefficients.shape[-1]
+        return 1 - (1 - self.r_squared) * (n - 1) / (n - p - 1)
+
+    def model(self, window: int) -> MultipleRegressionModel:
+        """Return the model of the given window of a single series as a
+        MultipleRegressionModel.
+
+        Preconditions:
+            - self.intercepts.ndim == 1
+            - 0 <= window < len(self.starts)
+        """
+        p = self.coefficients.shape[-1]
+        return MultipleRegressionModel(tuple('x' + str(i + 1) for i in range(p)),
+                                       float(self.intercepts[window]),
+                                       self.coefficients[window],
+                                       float(self.r_squared[window]),
+                                       float(self.adjusted_r_squared()[window]),
+                                       int(self.ends[window] - self.starts[window]))
+
+
+def window_bounds(length: int, window: Optional[int],
+                  min_window: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Return the (starts, ends) of every window of the given length over a history of
+    length observations, or of every expanding window of at least min_window observations
+    when window is None.
+
+    >>> window_bounds(5, 3, 3)
+    (array([0, 1, 2]), array([3, 4, 5]))
+    >>> window_bounds(5, None, 3)
+    (array([0, 0, 0]), array([3, 4, 5]))
+    """
+    if window is None:
+        ends = np.arange(min_window, length + 1)
+        return (np.zeros_like(ends), ends)
+    else:
+        starts = np.arange(0, length - window + 1)
+        return (starts, starts + window)
+
+
+def window_sums(values: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Return the sum of values over each window, where values has the observations along
+    its first axis. The windows are along the first axis of the result.
+
+    >>> values = np.array([1.0, 2.0, 3.0, 4.0])
+    >>> window_sums(values, np.array([0, 1]), np.array([3, 4])).tolist()
+    [6.0, 9.0]
+    """
+    cumulative = np.concatenate((np.zeros((1,) + values.shape[1:]), np.cumsum(values, axis=0)))
+    return cumulative[ends] - cumulative[starts]
+
+
+def rolling_simple_regression(x: np.ndarray, y: np.ndarray, window: Optional[int] = None,
+                              min_window: int = 3) -> RollingFit:
+    """Fit the simple linear regression y = a + bx on every window of the given history,
+    as simple_linear_regression would on each window.
+
+    x and y have the observations along their last axis; any leading axes are independent
+    series (such as regions), all fitted at once. window is the length of each rolling
+    window, or None for expanding windows of at least min_window observations.
+
+    Preconditions:
+        - x.shape == y.shape
+        - window is None or 2 <= window <= x.shape[-1]
+        - 2 <= min_window <= x.shape[-1]
+
+    >>> fit = rolling_simple_regression(np.array([1.0, 2.0, 3.0, 4.0]),
+    ...                                 np.array([2.0, 4.0, 6.0, 9.0]), window=3)
+    >>> fit.intercepts.round(6).tolist(), fit.coefficients[:, 0].round(6).tolist()
+    ([0.0, -1.166667], [2.0, 2.5])
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    starts, ends = window_bounds(x.shape[-1], window, min_window)
+
+    # Centre each series on its overall means, and put the observations on the first axis
+    mean_x = x.mean(axis=-1, keepdims=True)
+    mean_y = y.mean(axis=-1, keepdims=True)
+    xc = np.moveaxis(x - mean_x, -1, 0)
+    yc = np.moveaxis(y - mean_y, -1, 0)
+
+    sums = window_sums(np.stack((xc, yc, xc * xc, xc * yc, yc * yc), axis=-1), starts, ends)
+    sums = np.moveaxis(sums, 0, -2)
+    n = (ends - starts).astype(np.float64)
+    sum_x, sum_y, sum_xx, sum_xy, sum_yy = (sums[..., i] for i in range(5))
+
+    sxx = sum_xx - sum_x * sum_x / n
+    sxy = sum_xy - sum_x * sum_y / n
+    syy = sum_yy - sum_y * sum_y / n
+    b = sxy / sxx
+    a = (sum_y - b * sum_x) / n + mean_y - b * mean_x
+    return RollingFit(starts, ends, a, b[..., np.newaxis], sxy * sxy / (sxx * syy))
+
+
+def rolling_multiple_regression(x: np.ndarray, y: np.ndarray, window: Optional[int] = None,
+                                min_window: Optional[int] = None) -> RollingFit:
+    """Fit the multiple linear regression of y on the columns of x on every window of the
+    given history, as fit_multiple_regression would on each window.
+
+    x has shape (..., observations, predictors) and y has shape (..., observations); any
+    leading axes are independent series, all fitted at once. window is the length of each
+    rolling window, or None for expanding windows of at least min_window observations
+    (by default, two more than the number of predictors).
+
+    Preconditions:
+        - x.shape[:-1] == y.shape
+        - window is None or window > x.shape[-1] + 1
+        - min_window is None or min_window > x.shape[-1] + 1
+        - the predictors of every window are linearly independent
+
+    >>> x = np.array([[1.0, 0.0], [0.0, 1.0], [1.0, 1.0], [2.0, 1.0], [2.0, 3.0]])
+    >>> fit = rolling_multiple_regression(x, x @ np.array([2.0, 3.0]) + 1.0, window=4)
+    >>> fit.coefficients.round(6).tolist()
+    [[2.0, 3.0], [2.0, 3.0]]
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    p = x.shape[-1]
+    starts, ends = window_bounds(x.shape[-2], window, min_window or p + 2)
+
+    # Centre each series on its overall means, and put the observations on the first axis
+    mean_x = x.mean(axis=-2, keepdims=True)
+    mean_y = y.mean(axis=-1, keepdims=True)
+    xc = np.moveaxis(x - mean_x, -2, 0)
+    yc = np.moveaxis(y - mean_y, -1, 0)
+
+    # The design matrix [1, x] of every observation, and the cumulative sums of its products
+    design = np.concatenate((np.ones(xc.shape[:-1] + (1,)), xc), axis=-1)
+    gram = np.moveaxis(window_sums(design[..., :, np.newaxis] * design[..., np.newaxis, :],
+                                   starts, ends), 0, -3)
+    moment = np.moveaxis(window_sums(design * yc[..., np.newaxis], starts, ends), 0, -2)
+    sum_yy = np.moveaxis(window_sums(yc * yc, starts, ends), 0, -1)
+
+    beta = np.linalg.solve(gram, moment[..., np.newaxis])[..., 0]
+    coefficients = beta[..., 1:]
+    n = (ends - starts).astype(np.float64)
+    sum_y = moment[..., 0]
+
+    # At the least-squares solution, the residual sum of squares is yy - beta . X^T y
+    res = sum_yy - np.sum(beta * moment, axis=-1)
+    tot = sum_yy - sum_y * sum_y / n
+    intercepts = beta[..., 0] + mean_y - np.sum(mean_x * coefficients, axis=-1)
+    return RollingFit(starts, ends, intercepts, coefficients, 1 - res / tot)
+
+
+if __name__ == '__main__':
+    import doctest
+
+    doctest.testmod(verbose=True)
+
+    import python_ta
+    python_ta.check_all(config={
+        'extra-imports': ['dataclasses', 'typing', 'numpy', 'multiple_regression', 'python_ta'],
+        'allowed-io': [],
+        'max-line-length': 100,
+        'disable': ['R1705', 'C0200']
+    })
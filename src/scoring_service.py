@@ -0,0 +1,375 @@
+"""CSC110 final project, main module
+
+Descriptions
+===============================
+
+This module is a long-running service that predicts lyme disease cases from streamed
+rows of temperature, precipitation and (optionally) region.
+
+The models are fitted once when the service starts: for every reporting area of the
+training data, a multiple model on temperature and precipitation, and a simple model on
+each of them. Each batch of rows is then scored with one vectorized evaluation per region,
+without reloading data, refitting or plotting.
+
+Rows are csv lines 'temperature,precipitation[,region]', with an optional header line
+starting with 'temperature'. The output repeats each row with the predicted cases as an
+extra column; rows that cannot be parsed, or name an unknown region, get an empty
+prediction. The service reads whatever input is available, scores it as one batch and
+writes the predictions right away, so it has high throughput on large streams and low
+latency on single rows.
+
+The service runs over standard input and output:
+    python -c "import scoring_service; scoring_service.serve_stdio()" < rows.csv
+or as an HTTP endpoint on localhost, which takes rows as the body of POST /predict
+(with ?model=temperature or ?model=precipitation for a simple model) and streams the
+predictions back, and describes its models at GET /models. The endpoint receives the
+whole body before it responds, since ordinary HTTP clients only read the response once
+they have sent their request:
+    python -c "import scoring_service; scoring_service.serve_http()"
+
+Copyright and Usage Information
+===============================
+
+All forms of distribution of this code, whether as given or with any changes, are
+expressly prohibited. All rights reserved.
+
+This file is Copyright (c) 2020 Runshi Yang, Chenxu Wang and Haojun Qiu
+"""
+import csv
+import io
+import json
+import sys
+import tempfile
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+from model_registry import get_model
+from multiple_regression import MultipleRegressionModel, fit_multiple_regression
+from read_data import load_weather_table, load_disease_panel, load_disease_panel_table
+
+# The files the models are trained on, and the disease they predict
+TRAIN_FILES = ('datasets/weather_2014.csv', 'datasets/disease_2014.csv')
+DISEASE = 'Lyme disease'
+
+# The predictors of each kind of model
+MODEL_PREDICTORS = {'multiple': ('temperature', 'precipitation'),
+                    'temperature': ('temperature',),
+                    'precipitation': ('precipitation',)}
+
+# The most input bytes read (and so scored) at once
+CHUNK_BYTES = 64 * 1024
+
+# The most bytes of an HTTP request body kept in memory; larger bodies are spooled to disk
+SPOOL_BYTES = 16 * 1024 * 1024
+
+# The port of the HTTP endpoint
+HTTP_PORT = 8110
+
+
+def fit_scoring_models(weather_path: str, disease_path: str) \
+        -> Dict[Tuple[str, str], MultipleRegressionModel]:
+    """Return every kind of model of MODEL_PREDICTORS, fitted for every reporting area of
+    the given files, keyed by (area, kind). Each file is read once.
+
+    Preconditions:
+        - weather_path and disease_path refer to files as read by read_data.load_monthly_table
+        - the disease file has a DISEASE column
+    """
+    climate = load_weather_table(weather_path)
+    panel = load_disease_panel(disease_path)
+
+    models = {}
+    for area in panel.areas:
+        table = climate.join(load_disease_panel_table(panel, area, [DISEASE]))
+        for kind, predictors in MODEL_PREDICTORS.items():
+            models[(area, kind)] = fit_multiple_regression(table.select(list(predictors)),
+                                                           table.column(DISEASE), predictors)
+    return models
+
+
+class ScoringService:
+    """Fitted models, kept warm to score rows of climate data.
+
+    Instance Attributes:
+      - models: the model of each (area, kind), where kind is a key of MODEL_PREDICTORS
+      - default_region: the area used for rows that do not name one
+      - rows_scored: the number of rows scored so far
+      - lock: guards rows_scored, since an HTTP server scores from many threads at once
+
+    Representation Invariants:
+      - all((self.default_region, kind) in self.models for kind in MODEL_PREDICTORS)
+    """
+    __slots__ = ('models', 'default_region', 'rows_scored', 'lock')
+    models: Dict[Tuple[str, str], MultipleRegressionModel]
+    default_region: str
+    rows_scored: int
+    lock: threading.Lock
+
+    def __init__(self, models: Dict[Tuple[str, str], MultipleRegressionModel]) -> None:
+        self.models = models
+        self.default_region = min(area for area, _ in self.models)
+        self.rows_scored = 0
+        self.lock = threading.Lock()
+
+    def score(self, temperature: np.ndarray, precipitation: np.ndarray,
+              regions: Optional[Sequence[str]] = None, kind: str = 'multiple') -> np.ndarray:
+        """Return the predicted cases for each given temperature and precipitation, by the
+        given kind of model of each given region (by default, the default region). Rows
+        of an unknown region are predicted as NaN.
+
+        Preconditions:
+            - kind in MODEL_PREDICTORS
+            - len(temperature) == len(precipitation)
+            - regions is None or len(regions) == len(temperature)
+        """
+        x = np.column_stack((temperature, precipitation)).astype(np.float64)
+        columns = [('temperature', 'precipitation').index(name)
+                   for name in MODEL_PREDICTORS[kind]]
+        predicted = np.full(len(x), np.nan)
+
+        if regions is None:
+            regions = np.full(len(x), self.default_region)
+        regions = np.asarray(regions, dtype=object)
+        for region in set(regions.tolist()):
+            if (region, kind) in self.models:
+                rows = regions == region
+                predicted[rows] = self.models[(region, kind)].predict(x[rows][:, columns])
+
+        with self.lock:
+            self.rows_scored += len(x)
+        return predicted
+
+    def score_rows(self, rows: List[List[str]], kind: str = 'multiple') -> np.ndarray:
+        """Return the predicted cases for each given csv row 'temperature,precipitation
+        [,region]', as in score. Rows that cannot be parsed, including rows with fewer than
+        two cells, are predicted as NaN.
+
+        >>> model = MultipleRegressionModel(('temperature', 'precipitation'), 1.0,
+        ...                                 np.array([2.0, 10.0]), 0.5, 0.4, 12)
+        >>> service = ScoringService({('OHIO', 'multiple'): model})
+        >>> service.score_rows([['50', '3'], ['60']]).tolist()
+        [131.0, nan]
+        >>> service.score_rows([['50'], ['60']]).tolist()
+        [nan, nan]
+        """
+        parsed = np.full((len(rows), 2), np.nan)
+        regions = [row[2] if len(row) > 2 and row[2] != '' else self.default_region
+                   for row in rows]
+        try:
+            # Parse the whole batch at once, which only fails if some row is malformed
+            if any(len(row) < 2 for row in rows):
+                raise ValueError('some rows have fewer than two cells')
+            parsed[:] = np.array([row[:2] for row in rows], dtype=np.float64) \
+                .reshape(len(rows), 2)
+        except ValueError:
+            for i, row in enumerate(rows):
+                try:
+                    parsed[i] = [float(row[0]), float(row[1])]
+                except (ValueError, IndexError):
+                    regions[i] = ''
+
+        return self.score(parsed[:, 0], parsed[:, 1], regions, kind)
+
+    def stream(self, batches: Iterable[List[str]], write: Callable[[bytes], None],
+               kind: str = 'multiple') -> None:
+        """Score each batch of input csv lines and write its output csv lines right away.
+
+        >>> model = MultipleRegressionModel(('temperature', 'precipitation'), 1.0,
+        ...                                 np.array([2.0, 10.0]), 0.5, 0.4, 12)
+        >>> service = ScoringService({('OHIO', 'multiple'): model})
+        >>> output = io.BytesIO()
+        >>> service.stream([['temperature,precipitation', '50,3'], ['x,y']], output.write)
+        >>> print(output.getvalue().decode('utf-8').strip())
+        temperature,precipitation,predicted
+        50,3,131
+        x,y,
+        """
+        header_seen = False
+        for batch in batches:
+            rows = [row for row in csv.reader(batch) if row]
+            text = io.StringIO()
+            writer = csv.writer(text, lineterminator='\n')
+
+            if not header_seen and rows:
+                header_seen = True
+                if str.lower(str.strip(rows[0][0])) == 'temperature':
+                    writer.writerow(rows[0] + ['predicted'])
+                    rows = rows[1:]
+
+            predicted = self.score_rows(rows, kind)
+            for row, value in zip(rows, predicted.tolist()):
+                writer.writerow(row + ['' if np.isnan(value) else format(value, '.10g')])
+            write(text.getvalue().encode('utf-8'))
+
+    def describe(self) -> List[Dict]:
+        """Return a description of every model, as JSON-compatible values."""
+        return [{'region': region, 'model': kind, 'predictors': list(model.predictors),
+                 'intercept': model.intercept, 'coefficients': model.coefficients.tolist(),
+                 'r_squared': model.r_squared, 'n': model.n}
+                for (region, kind), model in sorted(self.models.items())]
+
+
+def load_scoring_service(weather_path: str = TRAIN_FILES[0],
+                         disease_path: str = TRAIN_FILES[1]) -> ScoringService:
+    """Return a service with every model fitted on the given files. The models are only
+    fitted once per process, unless the files change."""
+    return ScoringService(get_model((weather_path, disease_path), 'scoring models',
+                                    lambda: fit_scoring_models(weather_path, disease_path)))
+
+
+def line_batches(read: Callable[[int], bytes],
+                 chunk_bytes: int = CHUNK_BYTES) -> Iterator[List[str]]:
+    """Yield the complete lines of the input returned by read, a batch at a time.
+
+    read(size) returns at most size bytes, and an empty result at the end of the input.
+    Each batch is every complete line of one read, so a batch is as large as the input
+    that was available.
+
+    >>> chunks = iter([b'1,2\\n3,', b'4\\n5,6', b''])
+    >>> list(line_batches(lambda size: next(chunks)))
+    [['1,2'], ['3,4'], ['5,6']]
+    """
+    pending = b''
+    chunk = read(chunk_bytes)
+    while chunk:
+        lines = (pending + chunk).split(b'\n')
+        pending = lines.pop()
+        if lines:
+            yield [str.rstrip(line.decode('utf-8'), '\r') for line in lines]
+        chunk = read(chunk_bytes)
+
+    if pending.strip():
+        yield [str.rstrip(pending.decode('utf-8'), '\r')]
+
+
+def serve_stdio(kind: str = 'multiple', service: Optional[ScoringService] = None) -> None:
+    """Score rows read from standard input, writing the predictions to standard output,
+    until the input ends.
+
+    Preconditions:
+        - kind in MODEL_PREDICTORS
+    """
+    service = service or load_scoring_service()
+    output = sys.stdout.buffer
+
+    def write(data: bytes) -> None:
+        output.write(data)
+        output.flush()
+
+    # read1 returns whatever input is available, instead of waiting for a full chunk
+    service.stream(line_batches(sys.stdin.buffer.read1), write, kind)
+
+
+def make_handler(service: ScoringService) -> type:
+    """Return an HTTP request handler class that scores rows with the given service."""
+
+    class ScoringHandler(BaseHTTPRequestHandler):
+        """Handle POST /predict and GET /models requests."""
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self) -> None:
+            """Describe the models at /models."""
+            if urllib.parse.urlparse(self.path).path != '/models':
+                self.send_error(404)
+                return
+            body = json.dumps(service.describe()).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self) -> None:
+            """Score the csv rows of the body at /predict, streaming the predictions back."""
+            url = urllib.parse.urlparse(self.path)
+            kind = urllib.parse.parse_qs(url.query).get('model', ['multiple'])[0]
+            if url.path != '/predict' or kind not in MODEL_PREDICTORS:
+                self.send_error(404)
+                return
+
+            # Receive the whole body before responding: a client that is still sending
+            # its body does not read the response, so once the socket buffers fill up
+            # neither side could make progress
+            body = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES)
+            remaining = int(self.headers.get('Content-Length', 0))
+            while remaining > 0:
+                data = self.rfile.read1(min(CHUNK_BYTES, remaining))
+                if not data:
+                    break
+                body.write(data)
+                remaining -= len(data)
+            body.seek(0)
+
+            def write(data: bytes) -> None:
+                # Send each batch of predictions as one chunk, as soon as it is scored
+                if data:
+                    self.wfile.write(format(len(data), 'x').encode('ascii') + b'\r\n'
+                                     + data + b'\r\n')
+                    self.wfile.flush()
+
+            with body:
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/csv')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                service.stream(line_batches(body.read), write, kind)
+                self.wfile.write(b'0\r\n\r\n')
+
+        def log_message(self, format_string: str, *args: object) -> None:
+            """Do not log every request."""
+
+    return ScoringHandler
+
+
+def make_server(port: int = HTTP_PORT, service: Optional[ScoringService] = None) \
+        -> ThreadingHTTPServer:
+    """Return an HTTP server on localhost for the given service, without starting it.
+
+    A plain urllib client, which sends its whole request before reading the response, can
+    post a body far larger than the socket buffers:
+
+    >>> import urllib.request
+    >>> model = MultipleRegressionModel(('temperature', 'precipitation'), 1.0,
+    ...                                 np.array([2.0, 10.0]), 0.5, 0.4, 12)
+    >>> server = make_server(0, ScoringService({('OHIO', 'multiple'): model}))
+    >>> threading.Thread(target=server.serve_forever, daemon=True).start()
+    >>> request = urllib.request.Request(
+    ...     'http://127.0.0.1:' + str(server.server_address[1]) + '/predict',
+    ...     data=b'temperature,precipitation\\n' + b'51.25,3.125,OHIO\\n' * 600_000)
+    >>> with urllib.request.urlopen(request, timeout=60) as response:
+    ...     lines = response.read().splitlines()
+    >>> len(lines), lines[-1]
+    (600001, b'51.25,3.125,OHIO,134.75')
+    >>> server.shutdown()
+    >>> server.server_close()
+    """
+    return ThreadingHTTPServer(('127.0.0.1', port), make_handler(service or load_scoring_service()))
+
+
+def serve_http(port: int = HTTP_PORT) -> None:
+    """Serve predictions over HTTP on localhost at the given port, until interrupted."""
+    server = make_server(port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    import doctest
+
+    doctest.testmod(verbose=True)
+
+    import python_ta
+    python_ta.check_all(config={
+        'extra-imports': ['csv', 'io', 'json', 'sys', 'tempfile', 'threading', 'urllib.parse',
+                          'http.server', 'typing', 'numpy', 'model_registry',
+                          'multiple_regression', 'read_data', 'python_ta'],
+        'allowed-io': ['serve_stdio'],
+        'max-line-length': 100,
+        'disable': ['R1705', 'C0200', 'C0103']
+    })
@@ -14,8 +14,12 @@ expressly prohibited. All rights reserved.
 
 This file is Copyright (c) 2020 Runshi Yang, Chenxu Wang and Haojun Qiu
 """
-from typing import List, Tuple
-import plotly.graph_objects as go
+from dataclasses import dataclass
+from typing import Iterable, List, Tuple
+import numpy as np
+from decimation import WEBGL_THRESHOLD, MAX_PLOT_POINTS, density, thin_points
+from instrumentation import instrument, record_rows
+from rendering import render
 
 
 def evaluate_line(a: float, b: float, x: float) -> float:
@@ -42,6 +46,7 @@ def convert_points(points: List[tuple]) -> tuple:
     return (x_coordinates, y_coordinates)
 
 
+@instrument('simple fit')
 def simple_linear_regression(points: List[tuple]) -> tuple:
     """Perform a linear regression on the given points.
 
@@ -56,15 +61,18 @@ def simple_linear_regression(points: List[tuple]) -> tuple:
     >>> simple_linear_regression([(1.0, 1.0), (2.0, 2.0), (3.0, 3.0)])
     (0.0, 1.0)
     """
-    avg_x = sum(convert_points(points)[0]) / len(points)
-    avg_y = sum(convert_points(points)[1]) / len(points)
+    record_rows(len(points))
+    x_coords, y_coords = convert_points(points)
+    avg_x = sum(x_coords) / len(points)
+    avg_y = sum(y_coords) / len(points)
     numerator = [(p[0] - avg_x) * (p[1] - avg_y) for p in points]
-    denominator = [(p[0] - avg_x) ** 2 for p in points]
+    denominator = [(p[0] - avg_x) * (p[0] - avg_x) for p in points]
     b = sum(numerator) / sum(denominator)
     a = avg_y - b * avg_x
     return (a, b)
 
 
+@instrument('r squared')
 def calculate_r_squared(points: List[tuple], a: float, b: float) -> float:
     """Return the R squared value when the given points are modelled as the line y = a + bx.
 
@@ -73,12 +81,224 @@ def calculate_r_squared(points: List[tuple], a: float, b: float) -> float:
     Preconditions:
         - len(points) > 0
     """
-    avg_y = sum(convert_points(points)[1]) / len(points)
-    tot = [(avg_y - p[1]) ** 2 for p in points]
-    res = [(p[1] - (a + b * p[0])) ** 2 for p in points]
+    record_rows(len(points))
+    avg_y = sum(y for _, y in points) / len(points)
+    tot = [(avg_y - p[1]) * (avg_y - p[1]) for p in points]
+    res = [(p[1] - (a + b * p[0])) * (p[1] - (a + b * p[0])) for p in points]
     return 1 - sum(res) / sum(tot)
 
 
+def batch_simple_linear_regression(xs: np.ndarray,
+                                   ys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Perform a simple linear regression on every series of the given points at once.
+
+    xs and ys are 2-D arrays with one row per series and one column per point, so that
+    the points of series i are zip(xs[i], ys[i]). Return a pair of arrays (a, b) such that
+    the line y = a[i] + b[i] * x is the approximation of series i.
+
+    The sums run over the points in the same order as simple_linear_regression, so the
+    results are identical to calling it on each series.
+
+    Preconditions:
+        - xs.shape == ys.shape
+        - xs.ndim == 2 and xs.shape[1] > 0
+
+    >>> a, b = batch_simple_linear_regression(np.array([[1.0, 2.0, 3.0], [1.0, 2.0, 3.0]]),
+    ...                                       np.array([[1.0, 2.0, 3.0], [5.0, 3.0, 1.0]]))
+    >>> a.tolist(), b.tolist()
+    ([0.0, 7.0], [1.0, -2.0])
+    """
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    n = xs.shape[1]
+
+    # Summing over the transposed arrays adds one point of every series at a time
+    avg_x = sum(xs.T) / n
+    avg_y = sum(ys.T) / n
+    dx = xs - avg_x[:, np.newaxis]
+    numerator = sum((dx * (ys - avg_y[:, np.newaxis])).T)
+    denominator = sum((dx * dx).T)
+    b = numerator / denominator
+    a = avg_y - b * avg_x
+    return (a, b)
+
+
+def batch_r_squared(xs: np.ndarray, ys: np.ndarray, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Return the R squared value of every series of the given points, when series i is
+    modelled as the line y = a[i] + b[i] * x.
+
+    xs and ys are laid out as in batch_simple_linear_regression, and the results are
+    identical to calling calculate_r_squared on each series.
+
+    Preconditions:
+        - xs.shape == ys.shape
+        - xs.ndim == 2 and xs.shape[1] > 0
+        - a.shape == b.shape == (xs.shape[0],)
+    """
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    n = xs.shape[1]
+
+    avg_y = sum(ys.T) / n
+    dev = avg_y[:, np.newaxis] - ys
+    err = ys - (a[:, np.newaxis] + b[:, np.newaxis] * xs)
+    tot = sum((dev * dev).T)
+    res = sum((err * err).T)
+    return 1 - res / tot
+
+
+@instrument('batch simple fit')
+def batch_regression(xs: np.ndarray,
+                     ys: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Return (a, b, r_squared) arrays for the simple linear regression of every series
+    of the given points, laid out as in batch_simple_linear_regression.
+    """
+    record_rows(np.size(xs))
+    a, b = batch_simple_linear_regression(xs, ys)
+    return (a, b, batch_r_squared(xs, ys, a, b))
+
+
+@dataclass
+class RegressionAccumulator:
+    """The running sufficient statistics of a stream of points, from which the simple linear
+    regression of the points seen so far is available at any time.
+
+    Points can be added, removed and merged from other accumulators in O(1) each. Instead of
+    raw sums of x, y, xy, x^2 and y^2, the accumulator keeps the means and the centred sums
+    of squares and products, which carry the same information but do not lose precision
+    when the means are large compared to the spread of the points.
+
+    Instance Attributes:
+      - n: the number of points seen
+      - mean_x: the mean of the x-coordinates
+      - mean_y: the mean of the y-coordinates
+      - sxx: the sum of (x - mean_x) ** 2
+      - syy: the sum of (y - mean_y) ** 2
+      - sxy: the sum of (x - mean_x) * (y - mean_y)
+
+    Representation Invariants:
+      - self.n >= 0
+      - self.sxx >= 0 and self.syy >= 0
+
+    >>> acc = RegressionAccumulator()
+    >>> acc.add_points([(1.0, 1.0), (2.0, 2.0), (3.0, 3.0), (4.0, 0.0)])
+    >>> acc.remove(4.0, 0.0)
+    >>> acc.fit()
+    (0.0, 1.0)
+    >>> acc.r_squared()
+    1.0
+    """
+    n: int = 0
+    mean_x: float = 0.0
+    mean_y: float = 0.0
+    sxx: float = 0.0
+    syy: float = 0.0
+    sxy: float = 0.0
+
+    def add(self, x: float, y: float) -> None:
+        """Add the point (x, y)."""
+        self.n += 1
+        dx = x - self.mean_x
+        dy = y - self.mean_y
+        self.mean_x += dx / self.n
+        self.mean_y += dy / self.n
+        self.sxx += dx * (x - self.mean_x)
+        self.syy += dy * (y - self.mean_y)
+        self.sxy += dx * (y - self.mean_y)
+
+    def remove(self, x: float, y: float) -> None:
+        """Remove the point (x, y), which must have been added before.
+
+        Preconditions:
+          - self.n > 0
+        """
+        if self.n == 1:
+            self.n, self.mean_x, self.mean_y = 0, 0.0, 0.0
+            self.sxx, self.syy, self.sxy = 0.0, 0.0, 0.0
+            return
+
+        # Undo add: restore the means from before (x, y) was added, then subtract the
+        # same products that add contributed
+        current_mean_x, current_mean_y = self.mean_x, self.mean_y
+        self.n -= 1
+        self.mean_x -= (x - current_mean_x) / self.n
+        self.mean_y -= (y - current_mean_y) / self.n
+        dx = x - self.mean_x
+        dy = y - self.mean_y
+        self.sxx -= dx * (x - current_mean_x)
+        self.syy -= dy * (y - current_mean_y)
+        self.sxy -= dx * (y - current_mean_y)
+
+    def add_points(self, points: Iterable[tuple]) -> None:
+        """Add every point of the given batch."""
+        for p in points:
+            self.add(p[0], p[1])
+
+    def remove_points(self, points: Iterable[tuple]) -> None:
+        """Remove every point of the given batch, which must have been added before."""
+        for p in points:
+            self.remove(p[0], p[1])
+
+    def merge(self, other: 'RegressionAccumulator') -> 'RegressionAccumulator':
+        """Return an accumulator of the points seen by self and the points seen by other,
+        such as the partial results of two workers.
+
+        >>> left, right = RegressionAccumulator(), RegressionAccumulator()
+        >>> left.add_points([(1.0, 2.0), (2.0, 4.0)])
+        >>> right.add_points([(3.0, 6.0), (4.0, 8.0)])
+        >>> left.merge(right).fit()
+        (0.0, 2.0)
+        """
+        n = self.n + other.n
+        if self.n == 0 or other.n == 0:
+            return RegressionAccumulator(**vars(self if other.n == 0 else other))
+
+        dx = other.mean_x - self.mean_x
+        dy = other.mean_y - self.mean_y
+        weight = self.n * other.n / n
+        return RegressionAccumulator(n=n,
+                                     mean_x=self.mean_x + dx * other.n / n,
+                                     mean_y=self.mean_y + dy * other.n / n,
+                                     sxx=self.sxx + other.sxx + dx * dx * weight,
+                                     syy=self.syy + other.syy + dy * dy * weight,
+                                     sxy=self.sxy + other.sxy + dx * dy * weight)
+
+    def fit(self) -> Tuple[float, float]:
+        """Return the pair (a, b) such that the line y = a + bx is the least-squares
+        approximation of the points seen, like simple_linear_regression.
+
+        Preconditions:
+          - self.sxx > 0
+        """
+        b = self.sxy / self.sxx
+        return (self.mean_y - b * self.mean_x, b)
+
+    def r_squared(self) -> float:
+        """Return the R squared value of the least-squares line of the points seen.
+
+        Preconditions:
+          - self.sxx > 0 and self.syy > 0
+        """
+        return self.sxy * self.sxy / (self.sxx * self.syy)
+
+    def r_squared_for(self, a: float, b: float) -> float:
+        """Return the R squared value when the points seen are modelled as the line
+        y = a + bx, like calculate_r_squared.
+
+        Preconditions:
+          - self.syy > 0
+
+        >>> acc = RegressionAccumulator()
+        >>> acc.add_points([(1.0, 1.0), (2.0, 2.0), (3.0, 4.0)])
+        >>> round(acc.r_squared_for(0.0, 1.0), 6)
+        0.785714
+        """
+        # The residual about the line, split into its spread and its offset at the means
+        offset = self.mean_y - (a + b * self.mean_x)
+        res = self.syy - 2 * b * self.sxy + b * b * self.sxx + self.n * offset * offset
+        return 1 - res / self.syy
+
+
 def perform_regression(train_data: List[tuple], xlabel: str,
                        title: str) -> Tuple[float, float, float]:
     """Return (a, b, r_squared)
@@ -110,25 +330,48 @@ def perform_regression(train_data: List[tuple], xlabel: str,
 def plot_points_and_regression(x_coords: list, y_coords: list, coef: List[float],
                                xlabel: str, title: str) -> None:
     """Plot the given x- and y-coordinates and linear regression model using plotly.
-    """
-    # Create a blank figure
-    layout = go.Layout(title=title,
-                       xaxis={'title': xlabel},
-                       yaxis={'title': 'number of cases'})
-
-    fig = go.Figure(layout=layout)
 
-    # Add the raw data
-    fig.add_trace(go.Scatter(x=x_coords, y=y_coords, mode='markers', name='Data'))
+    More than WEBGL_THRESHOLD points are drawn with WebGL instead of SVG. More than
+    MAX_PLOT_POINTS points are shown as a density heatmap, overlaid with a thinned subset
+    of the points, so the figure stays small however many points there are.
 
-    # Add the regression line
-    x_max = 1.1 * max(x_coords)
-    fig.add_trace(go.Scatter(x=[0, x_max], y=[evaluate_line(coef[0], coef[1], 0),
-                                              evaluate_line(coef[0], coef[1], x_max)],
-                             mode='lines', name='Regression line'))
-
-    # Display the figure in a web browser
-    fig.show()
+    The figure is handled by rendering.render, so in 'file' mode this returns right away.
+    """
+    def build() -> object:
+        # plotly is only imported once a plot is actually drawn
+        import plotly.graph_objects as go
+
+        # Create a blank figure
+        layout = go.Layout(title=title,
+                           xaxis={'title': xlabel},
+                           yaxis={'title': 'number of cases'})
+
+        fig = go.Figure(layout=layout)
+
+        # Add the raw data
+        if len(x_coords) <= WEBGL_THRESHOLD:
+            fig.add_trace(go.Scatter(x=x_coords, y=y_coords, mode='markers', name='Data'))
+        else:
+            x_array = np.asarray(x_coords, dtype=np.float64)
+            y_array = np.asarray(y_coords, dtype=np.float64)
+            if len(x_array) > MAX_PLOT_POINTS:
+                centres_x, centres_y, counts = density(x_array, y_array)
+                fig.add_trace(go.Heatmap(x=centres_x, y=centres_y, z=counts, name='Density',
+                                         colorscale='Blues', showscale=False))
+                kept = thin_points(np.column_stack((x_array, y_array)))
+                x_array, y_array = x_array[kept], y_array[kept]
+            fig.add_trace(go.Scattergl(x=x_array, y=y_array, mode='markers', name='Data'))
+
+        # Add the regression line
+        x_max = 1.1 * max(x_coords)
+        fig.add_trace(go.Scatter(x=[0, x_max], y=[evaluate_line(coef[0], coef[1], 0),
+                                                  evaluate_line(coef[0], coef[1], x_max)],
+                                 mode='lines', name='Regression line'))
+        return fig
+
+    # Display the figure in a web browser, write it to a file, or skip it,
+    # depending on the rendering mode
+    render(build, title)
 
 
 def predict(test_data: List[Tuple], model: Tuple[float, float, float],
@@ -163,7 +406,8 @@ if __name__ == '__main__':
     import python_ta
 
     python_ta.check_all(config={
-        'extra-imports': ['plotly.graph_objects', 'python_ta'],
+        'extra-imports': ['dataclasses', 'numpy', 'plotly.graph_objects', 'decimation',
+                          'instrumentation', 'rendering', 'python_ta'],
         'allowed-io': [],
         'max-line-length': 100,
         'disable': ['R1705', 'C0200']
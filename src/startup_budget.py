@@ -0,0 +1,99 @@
+"""CSC110 final project, main module
+
+Descriptions
+===============================
+
+This module measures how long it takes to import our modules in a fresh Python process,
+and checks those import times against our startup budget.
+
+Heavy dependencies (pandas, scikit-learn, matplotlib and plotly) are imported
+only inside the functions that use them, so importing our modules should stay
+well within the budget, whether plots are shown or written to files in the background.
+
+Copyright and Usage Information
+===============================
+
+All forms of distribution of this code, whether as given or with any changes, are
+expressly prohibited. All rights reserved.
+
+This file is Copyright (c) 2020 Runshi Yang, Chenxu Wang and Haojun Qiu
+"""
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, Tuple
+
+# The maximum import time, in seconds, allowed for each module
+STARTUP_BUDGET = {
+    'main': 0.3,
+    'read_data': 0.25,
+    'simple_regression': 0.25,
+    'multiple_regression': 0.25
+}
+
+# The modules that must not be imported just by importing one of our modules
+HEAVY_MODULES = ('pandas', 'sklearn', 'matplotlib', 'plotly')
+
+# The plot modes (the PLOT_MODE environment variable) each module is imported under
+PLOT_MODES = ('show', 'file')
+
+MEASURE_SCRIPT = '''
+import sys, time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+print(' '.join(name for name in {heavy!r} if name in sys.modules))
+'''
+
+
+def measure_import_time(module: str, repeats: int = 5,
+                        plot_mode: str = 'show') -> Tuple[float, list]:
+    """Return the median time, in seconds, to import the given module in a fresh Python
+    process with the given PLOT_MODE over the given number of runs, along with the heavy
+    modules it pulled in.
+
+    Preconditions:
+        - repeats > 0
+    """
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    environment = dict(os.environ, PLOT_MODE=plot_mode)
+    times = []
+    heavy = []
+    for _ in range(repeats):
+        output = subprocess.run([sys.executable, '-c',
+                                 MEASURE_SCRIPT.format(module=module, heavy=HEAVY_MODULES)],
+                                cwd=src_dir, env=environment, capture_output=True, text=True,
+                                check=True).stdout
+        lines = str.split(output, '\n')
+        list.append(times, float(lines[0]))
+        heavy = str.split(lines[1])
+    return (statistics.median(times), heavy)
+
+
+def check_startup_budget(repeats: int = 5) -> Dict[Tuple[str, str], Tuple[float, float, bool]]:
+    """Return a mapping from each module in STARTUP_BUDGET and each plot mode in PLOT_MODES
+    to (import time, budget, ok), where ok is whether the module was imported within its
+    budget without pulling in any heavy module.
+    """
+    report_so_far = {}
+    for module, budget in STARTUP_BUDGET.items():
+        for plot_mode in PLOT_MODES:
+            import_time, heavy = measure_import_time(module, repeats, plot_mode)
+            report_so_far[(module, plot_mode)] = (import_time, budget,
+                                                  import_time <= budget and heavy == [])
+    return report_so_far
+
+
+if __name__ == '__main__':
+    import doctest
+
+    doctest.testmod(verbose=True)
+
+    import python_ta
+    python_ta.check_all(config={
+        'extra-imports': ['os', 'statistics', 'subprocess', 'sys', 'typing', 'python_ta'],
+        'allowed-io': [],
+        'max-line-length': 100,
+        'disable': ['R1705', 'C0200']
+    })
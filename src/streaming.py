@@ -0,0 +1,208 @@
+"""CSC110 final project, main module
+
+Descriptions
+===============================
+
+This module reads huge daily weather files and weekly disease files (such as multi-GB
+extracts covering many stations or reporting areas) in bounded memory.
+
+The rows of a file are read in chunks of a fixed number of rows by a generator, and each
+chunk is folded straight into the monthly summaries of its station (or reporting area)
+before the next one is read. Only one chunk and the monthly summaries are ever held in
+memory, so memory stays flat no matter how long the file is.
+
+A row that cannot be parsed, such as one with a non-numeric precipitation cell other
+than the trace amount 'T', is skipped and recorded in a StreamReport instead of
+aborting the stream.
+
+Copyright and Usage Information
+===============================
+
+All forms of distribution of this code, whether as given or with any changes, are
+expressly prohibited. All rights reserved.
+
+This file is Copyright (c) 2020 Runshi Yang, Chenxu Wang and Haojun Qiu
+"""
+import csv
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+from data_class import MonthlyStats, ClimateTable
+from ingest import MonthlyAggregator, add_disease_row
+from read_data import climate_variable_names, climate_table_from_stats, parse_climate_value, \
+    str_to_date
+
+# The number of rows read and folded at a time
+CHUNK_ROWS = 100_000
+
+# The number of bad rows whose details are kept in a StreamReport
+MAX_EXAMPLES = 20
+
+
+@dataclass
+class StreamReport:
+    """What happened to the rows of one streamed file.
+
+    Instance Attributes:
+      - rows: the number of data rows read
+      - bad_rows: the number of rows that could not be parsed and were skipped
+      - examples: the (line number, reason) of the first MAX_EXAMPLES bad rows
+
+    Representation Invariants:
+      - 0 <= self.bad_rows <= self.rows
+      - len(self.examples) == min(self.bad_rows, MAX_EXAMPLES)
+    """
+    rows: int = 0
+    bad_rows: int = 0
+    examples: List[Tuple[int, str]] = field(default_factory=list)
+
+    def reject(self, line: int, reason: str) -> None:
+        """Record that the row on the given line was skipped for the given reason."""
+        self.bad_rows += 1
+        if len(self.examples) < MAX_EXAMPLES:
+            list.append(self.examples, (line, reason))
+
+
+def read_chunks(reader: Iterator[List[str]], report: StreamReport,
+                chunk_rows: int = CHUNK_ROWS) -> Iterator[List[Tuple[int, List[str]]]]:
+    """Yield the rows of the csv reader in lists of at most chunk_rows (line number, row)
+    pairs, counting every row read in report. The line number is the physical line of the
+    file the row ends on, so it stays right after quoted cells spanning several lines.
+
+    A row the reader itself cannot parse (raising csv.Error, such as one with a stray
+    quote under strict mode) is recorded in report as a bad row and skipped.
+
+    Preconditions:
+        - chunk_rows > 0
+
+    >>> reader = csv.reader(['a\\n', '1\\n', '"2\\n', '3"\\n', '4\\n', '5\\n'])
+    >>> header = next(reader)
+    >>> [[line for line, _ in chunk] for chunk in read_chunks(reader, StreamReport(), 2)]
+    [[2, 4], [5, 6]]
+    >>> reader = csv.reader(['a,b\\n', '1,"x"y\\n', '2,3\\n'], strict=True)
+    >>> header, report = next(reader), StreamReport()
+    >>> [[line for line, _ in chunk] for chunk in read_chunks(reader, report)]
+    [[3]]
+    >>> report.rows, report.bad_rows, report.examples[0][0]
+    (2, 1, 2)
+    """
+    chunk = []
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            break
+        except csv.Error as error:
+            report.rows += 1
+            report.reject(reader.line_num, str(error))
+            continue
+
+        report.rows += 1
+        list.append(chunk, (reader.line_num, row))
+        if len(chunk) == chunk_rows:
+            yield chunk
+            chunk = []
+
+    if chunk:
+        yield chunk
+
+
+def stream_climate(filepath: str, chunk_rows: int = CHUNK_ROWS,
+                   station_column: Optional[str] = None) \
+        -> Tuple[Dict[str, ClimateTable], StreamReport]:
+    """Return the monthly values of every climate variable of each station in the daily
+    weather file at filepath, aggregated as in read_data.load_climate_table, along with a
+    report of the rows read.
+
+    The file is in the format of datasets/weather_2016.csv, optionally with an extra column
+    named station_column identifying the station of each row. Without a station column,
+    every row belongs to a single station named filepath.
+
+    Preconditions:
+        - filepath refers to a csv file as described above
+        - station_column is None or it is a column of the file
+        - chunk_rows > 0
+    """
+    with open(filepath) as file:
+        reader = csv.reader(file)
+        header = next(reader)
+
+        # Split the station column, if any, from the date and climate columns
+        station = header.index(station_column) if station_column is not None else None
+        columns = [i for i in range(len(header)) if i != station]
+        names = climate_variable_names([header[i] for i in columns])
+
+        report = StreamReport()
+        stations_so_far = {}
+        for chunk in read_chunks(reader, report, chunk_rows):
+            for line, row in chunk:
+                try:
+                    if len(row) != len(header):
+                        raise ValueError('expected ' + str(len(header)) + ' cells, got '
+                                         + str(len(row)))
+                    date = str_to_date(row[columns[0]])
+                    values = [parse_climate_value(row[i]) for i in columns[1:]]
+                except (ValueError, IndexError) as error:
+                    report.reject(line, str(error))
+                    continue
+
+                name = row[station] if station is not None else filepath
+                if name not in stations_so_far:
+                    stations_so_far[name] = {}
+                months = stations_so_far[name]
+                key = (date.year, date.month)
+                if key not in months:
+                    months[key] = [MonthlyStats() for _ in names]
+                for stats, value in zip(months[key], values):
+                    stats.add(value)
+
+    return ({name: climate_table_from_stats(names, months)
+             for name, months in stations_so_far.items()}, report)
+
+
+def stream_disease(filepath: str,
+                   chunk_rows: int = CHUNK_ROWS) -> Tuple[MonthlyAggregator, StreamReport]:
+    """Return the monthly cases of every disease in every reporting area of the weekly
+    disease file at filepath, as an aggregator (see MonthlyAggregator.disease_table),
+    along with a report of the rows read.
+
+    Preconditions:
+        - filepath refers to a csv file in the format of datasets/disease_2016.csv
+        - chunk_rows > 0
+    """
+    with open(filepath) as file:
+        reader = csv.reader(file)
+
+        # Disease columns are named like 'Lyme disease, Current week'
+        header = next(reader)
+        diseases = [str.split(column, ',')[0] for column in header[3:]]
+
+        report = StreamReport()
+        summaries = {}
+        for chunk in read_chunks(reader, report, chunk_rows):
+            for line, row in chunk:
+                try:
+                    if len(row) != len(header):
+                        raise ValueError('expected ' + str(len(header)) + ' cells, got '
+                                         + str(len(row)))
+                    add_disease_row(summaries, diseases, row)
+                except (ValueError, IndexError) as error:
+                    report.reject(line, str(error))
+
+    aggregator = MonthlyAggregator()
+    aggregator.merge('disease', summaries)
+    return (aggregator, report)
+
+
+if __name__ == '__main__':
+    import doctest
+
+    doctest.testmod(verbose=True)
+
+    import python_ta
+    python_ta.check_all(config={
+        'extra-imports': ['csv', 'dataclasses', 'typing', 'data_class', 'ingest',
+                          'read_data', 'python_ta'],
+        'allowed-io': ['stream_climate', 'stream_disease'],
+        'max-line-length': 100,
+        'disable': ['R1705', 'C0200']
+    })
@@ -0,0 +1,301 @@
+"""CSC110 final project, main module
+
+Descriptions
+===============================
+
+This module selects the predictors of our multiple linear regression models: instead of
+only temperature and precipitation, it fits every subset of the weather columns (and,
+optionally, their squares and pairwise interactions) and ranks the subsets by adjusted
+R squared value and by cross-validated mean squared error.
+
+Every subset is solved from one shared Gram matrix. The predictors are standardized and
+laid out with an intercept column and the response as A = [1, x, y], and A^T A is
+computed once; the normal equations of a subset are then a submatrix of it, and the
+training set of each cross-validation fold is A^T A minus the Gram matrix of that fold.
+The subsets of each size are solved together in batches, so an exhaustive search over
+about ten predictors takes a fraction of a second.
+
+Copyright and Usage Information
+===============================
+
+All forms of distribution of this code, whether as given or with any changes, are
+expressly prohibited. All rights reserved.
+
+This file is Copyright (c) 2020 Runshi Yang, Chenxu Wang and Haojun Qiu
+"""
+import itertools
+import math
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+from data_class import MonthlyTable
+from multiple_regression import MultipleRegressionModel, fit_multiple_regression
+
+# The number of subsets of one size solved together
+CHUNK_SUBSETS = 10_000
+
+# Normal equations whose smallest singular value is at most this fraction of their largest
+# are treated as singular: a fold's training Gram matrix is the difference of two Gram
+# matrices, so an exactly singular one keeps rounding errors far above NumPy's default
+# tolerance
+RANK_TOLERANCE = 1e-10
+
+# The criteria subsets can be ranked by
+RANKINGS = ('adjusted_r_squared', 'cv_mse')
+
+
+@dataclass
+class SubsetFit:
+    """The fit of the multiple linear regression of a response on one subset of predictors.
+
+    Instance Attributes:
+      - predictors: the name of each predictor of the subset
+      - r_squared: the R squared value of the model on all the observations
+      - adjusted_r_squared: the R squared value adjusted for the number of predictors
+      - cv_mse: the cross-validated mean squared error of the model, which is NaN when
+        the model cannot be fitted on the training observations of some fold
+
+    Representation Invariants:
+      - len(self.predictors) >= 1
+    """
+    predictors: Tuple[str, ...]
+    r_squared: float
+    adjusted_r_squared: float
+    cv_mse: float
+
+
+def expand_features(x: np.ndarray, names: Sequence[str], squares: bool = False,
+                    interactions: bool = False) -> Tuple[np.ndarray, List[str]]:
+    """Return the columns of x followed by the square of each column (if squares) and the
+    product of each pair of columns (if interactions), along with their names.
+
+    >>> x, names = expand_features(np.array([[1.0, 2.0], [3.0, 4.0]]), ['a', 'b'], True, True)
+    >>> names, x.tolist()
+    (['a', 'b', 'a^2', 'b^2', 'a*b'], [[1.0, 2.0, 1.0, 4.0, 2.0], [3.0, 4.0, 9.0, 16.0, 12.0]])
+    """
+    x = np.asarray(x, dtype=np.float64)
+    columns = [x[:, i] for i in range(x.shape[1])]
+    names = list(names)
+
+    if squares:
+        columns += [x[:, i] ** 2 for i in range(x.shape[1])]
+        names += [name + '^2' for name in names[:x.shape[1]]]
+    if interactions:
+        for i, j in itertools.combinations(range(x.shape[1]), 2):
+            list.append(columns, x[:, i] * x[:, j])
+            list.append(names, names[i] + '*' + names[j])
+
+    return (np.column_stack(columns).reshape(len(x), len(names)), names)
+
+
+def design_matrix(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Return A = [1, x, y], with the columns of x standardized and y centred, so that the
+    Gram matrix A^T A is well conditioned.
+
+    A constant column of x is only centred, so it stays a column of zeros.
+    """
+    scale = x.std(axis=0)
+    scale[scale == 0] = 1.0
+    return np.column_stack((np.ones(len(y)), (x - x.mean(axis=0)) / scale, y - y.mean()))
+
+
+def fold_assignments(n: int, folds: Optional[int], seed: int) -> np.ndarray:
+    """Return the fold of each of n observations, assigned at random as
+    resampling.cross_validate does, or one fold per observation when folds is None.
+
+    >>> np.bincount(fold_assignments(10, 3, 0)).tolist()
+    [4, 3, 3]
+    """
+    folds = n if folds is None else folds
+    return np.random.default_rng(seed).permutation(np.arange(n) % folds)
+
+
+def solve_batch(grams: np.ndarray, targets: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Return the solution of each system grams[...] @ b = targets[...], and which of the
+    systems are singular (up to RANK_TOLERANCE). The solutions of singular systems are
+    meaningless.
+
+    >>> solutions, singular = solve_batch(np.array([[[2.0, 0.0], [0.0, 4.0]],
+    ...                                             [[1.0, 1.0], [1.0, 1.0]]]),
+    ...                                   np.array([[2.0, 2.0], [1.0, 1.0]]))
+    >>> solutions[0].tolist(), singular.tolist()
+    ([1.0, 0.5], [False, True])
+    """
+    singular_values = np.linalg.svd(grams, compute_uv=False)
+    singular = singular_values[..., -1] <= RANK_TOLERANCE * singular_values[..., 0]
+
+    # Solve the singular systems as identities instead, so they do not stop the others
+    grams = np.where(singular[..., np.newaxis, np.newaxis], np.eye(grams.shape[-1]), grams)
+    return (np.linalg.solve(grams, targets[..., np.newaxis])[..., 0], singular)
+
+
+def subset_errors(gram: np.ndarray, fold_grams: np.ndarray,
+                  subsets: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Return the residual sum of squares on all the observations, and the cross-validated
+    sum of squared errors, of the model of each given subset of predictors.
+
+    gram is A^T A for A = design_matrix(x, y), fold_grams holds the Gram matrix of the
+    observations of each fold, and each row of subsets holds the columns of x in one
+    subset. Subsets that are linearly dependent on all the observations get NaN for both,
+    and subsets that are linearly dependent on the training observations of some fold
+    (such as when the fold is too small to fit them) get a NaN cross-validated error.
+    """
+    subsets_so_far = len(subsets)
+    response = gram.shape[0] - 1
+    columns = np.column_stack((np.zeros(subsets_so_far, dtype=np.int64), subsets + 1))
+    rows, cols = columns[:, :, np.newaxis], columns[:, np.newaxis, :]
+
+    # The normal equations of each subset on all the observations
+    subset_targets = gram[columns, response]
+    coefficients, singular = solve_batch(gram[rows, cols], subset_targets)
+    sse = gram[response, response] - np.sum(coefficients * subset_targets, axis=-1)
+    sse[singular] = np.nan
+
+    # The normal equations of each subset on the training observations of each fold, and
+    # the squared errors of the fitted model on the test observations of that fold
+    training = gram - fold_grams
+    coefficients, singular = solve_batch(training[:, rows, cols],
+                                         training[:, columns, response])
+    test_targets = fold_grams[:, columns, response]
+    test_errors = fold_grams[:, response, response][:, np.newaxis] \
+        - 2 * np.sum(coefficients * test_targets, axis=-1) \
+        + np.einsum('fsi,fsij,fsj->fs', coefficients, fold_grams[:, rows, cols], coefficients)
+    cv_sse = np.sum(test_errors, axis=0)
+    cv_sse[np.any(singular, axis=0) | np.isnan(sse)] = np.nan
+
+    return (sse, cv_sse)
+
+
+def search_subsets(x: np.ndarray, y: np.ndarray, names: Sequence[str],
+                   max_predictors: Optional[int] = None, folds: Optional[int] = 5,
+                   seed: int = 0, rank_by: str = 'adjusted_r_squared') -> List[SubsetFit]:
+    """Fit the multiple linear regression of y on every subset of the columns of x with at
+    most max_predictors columns, and return the fits ranked by rank_by, best first.
+
+    The cross-validated error is the mean squared error of k-fold cross-validation (or
+    leave-one-out cross-validation when folds is None), with the same folds as
+    resampling.cross_validate(x[:, subset], y, folds, seed). max_predictors defaults to
+    the largest subset that leaves at least one residual degree of freedom. Subsets that
+    cannot be fitted rank last.
+
+    Preconditions:
+        - x.ndim == 2 and y.shape == (x.shape[0],)
+        - names has one name per column of x
+        - folds is None or 2 <= folds <= len(y)
+        - rank_by in RANKINGS
+
+    >>> x = np.array([[1.0, 3.0, 0.0], [2.0, 1.0, 1.0], [3.0, 4.0, 0.0], [4.0, 1.0, 1.0],
+    ...               [5.0, 5.0, 0.0], [6.0, 9.0, 1.0], [7.0, 2.0, 0.0], [8.0, 6.0, 1.0]])
+    >>> y = 2 * x[:, 0] - x[:, 2] + np.array([0.1, -0.1, 0.0, 0.1, -0.1, 0.0, 0.1, -0.1])
+    >>> fits = search_subsets(x, y, ['a', 'b', 'c'], folds=None)
+    >>> len(fits), fits[0].predictors, round(fits[0].r_squared, 4)
+    (7, ('a', 'c'), 0.9997)
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n, p = x.shape
+    if max_predictors is None:
+        max_predictors = min(p, n - 2)
+
+    design = design_matrix(x, y)
+    gram = design.T @ design
+    fold_of = fold_assignments(n, folds, seed)
+    fold_grams = np.stack([design[fold_of == fold].T @ design[fold_of == fold]
+                           for fold in range(int(fold_of.max()) + 1)])
+    total = gram[-1, -1]
+
+    fits_so_far = []
+    for size in range(1, max_predictors + 1):
+        combinations = itertools.combinations(range(p), size)
+        chunk = list(itertools.islice(combinations, CHUNK_SUBSETS))
+        while chunk:
+            subsets = np.array(chunk, dtype=np.int64).reshape(len(chunk), size)
+            sse, cv_sse = subset_errors(gram, fold_grams, subsets)
+            r_squared = 1 - sse / total
+            adjusted = 1 - (1 - r_squared) * (n - 1) / (n - size - 1) if n > size + 1 \
+                else np.full(len(chunk), np.nan)
+            for subset, r2, adjusted_r2, error in zip(chunk, r_squared.tolist(), adjusted.tolist(),
+                                                      (cv_sse / n).tolist()):
+                list.append(fits_so_far, SubsetFit(tuple(names[i] for i in subset), r2,
+                                                   adjusted_r2, error))
+            chunk = list(itertools.islice(combinations, CHUNK_SUBSETS))
+
+    return rank_subsets(fits_so_far, rank_by)
+
+
+def rank_subsets(fits: List[SubsetFit], rank_by: str = 'adjusted_r_squared') -> List[SubsetFit]:
+    """Return the given fits ranked by rank_by, best first: the largest adjusted R squared
+    value or the smallest cross-validated error. Fits whose criterion is NaN rank last.
+
+    Preconditions:
+        - rank_by in RANKINGS
+
+    >>> fits = [SubsetFit(('a',), 0.5, 0.4, 2.0), SubsetFit(('b',), 0.6, 0.5, 3.0),
+    ...         SubsetFit(('a', 'b'), 0.7, float('nan'), 1.0)]
+    >>> [fit.predictors for fit in rank_subsets(fits, 'adjusted_r_squared')]
+    [('b',), ('a',), ('a', 'b')]
+    >>> [fit.predictors for fit in rank_subsets(fits, 'cv_mse')]
+    [('a', 'b'), ('a',), ('b',)]
+    """
+    if rank_by == 'adjusted_r_squared':
+        return sorted(fits, key=lambda fit: (math.isnan(fit.adjusted_r_squared),
+                                             -fit.adjusted_r_squared, fit.cv_mse))
+    else:
+        return sorted(fits, key=lambda fit: (math.isnan(fit.cv_mse), fit.cv_mse,
+                                             -fit.adjusted_r_squared))
+
+
+def table_subset_search(table: MonthlyTable, predictors: Sequence[str], response: str,
+                        squares: bool = False, interactions: bool = False,
+                        max_predictors: Optional[int] = None, folds: Optional[int] = 5,
+                        seed: int = 0, rank_by: str = 'adjusted_r_squared') -> List[SubsetFit]:
+    """Search every subset of the given predictor columns of table, and of their squares
+    and interactions if asked for, as predictors of the response column.
+
+    Preconditions:
+        - all(name in table.names for name in predictors) and response in table.names
+        - folds is None or 2 <= folds <= len(table)
+        - rank_by in RANKINGS
+    """
+    x, names = expand_features(table.select(list(predictors)), predictors, squares,
+                               interactions)
+    return search_subsets(x, table.column(response), names, max_predictors, folds, seed,
+                          rank_by)
+
+
+def fit_subset(table: MonthlyTable, fit: SubsetFit, response: str) -> MultipleRegressionModel:
+    """Return the multiple regression model of the response column of table on the
+    predictors of fit, which may include squares and interactions of its columns.
+
+    Preconditions:
+        - the predictors of fit are columns of table, or their squares ('name^2') or
+          interactions ('name*name') as named by expand_features
+        - response in table.names
+    """
+    columns = []
+    for predictor in fit.predictors:
+        if predictor in table.names:
+            list.append(columns, table.column(predictor))
+        elif predictor.endswith('^2'):
+            list.append(columns, table.column(predictor[:-2]) ** 2)
+        else:
+            first, second = str.split(predictor, '*')
+            list.append(columns, table.column(first) * table.column(second))
+
+    return fit_multiple_regression(np.column_stack(columns), table.column(response),
+                                   fit.predictors)
+
+
+if __name__ == '__main__':
+    import doctest
+
+    doctest.testmod(verbose=True)
+
+    import python_ta
+    python_ta.check_all(config={
+        'extra-imports': ['itertools', 'math', 'dataclasses', 'typing', 'numpy', 'data_class',
+                          'multiple_regression', 'python_ta'],
+        'allowed-io': [],
+        'max-line-length': 100,
+        'disable': ['R1705', 'C0200']
+    })
@@ -0,0 +1,215 @@
+"""CSC110 final project, main module
+
+Descriptions
+===============================
+
+This module runs a sweep of regression models over a grid of training years, test years,
+regions, diseases and predictor sets, spreading the data loading and the model fitting
+across a pool of processes.
+
+Each weather file and disease file is parsed once, however many regions of it the sweep
+uses: the monthly table of every region is sliced from the disease panel in the process
+that parsed it, and only those small tables are sent on to the fitting processes.
+
+Copyright and Usage Information
+===============================
+
+All forms of distribution of this code, whether as given or with any changes, are
+expressly prohibited. All rights reserved.
+
+This file is Copyright (c) 2020 Runshi Yang, Chenxu Wang and Haojun Qiu
+"""
+import csv
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from data_class import MonthlyTable
+from read_data import load_weather_table, load_disease_panel, load_disease_panel_table
+from simple_regression import simple_linear_regression, calculate_r_squared
+from multiple_regression import fit_multiple_regression
+
+# The default locations of the datasets of a region in a year
+WEATHER_PATH = 'datasets/weather_{year}.csv'
+DISEASE_PATH = 'datasets/disease_{year}.csv'
+
+# The number of chunks of tasks sent to each worker process when fitting
+CHUNKS_PER_WORKER = 4
+
+
+@dataclass(frozen=True)
+class SweepTask:
+    """One model of a sweep: a regression of a disease on some climate variables, trained
+    on one year and tested on another.
+
+    Instance Attributes:
+      - train_year: the year whose data the model is fitted on
+      - test_year: the year whose data the model is evaluated on
+      - region: the reporting area of the disease data
+      - disease: the name of the disease column to predict
+      - predictors: the names of the climate variables to predict it from
+
+    Representation Invariants:
+      - len(self.predictors) > 0
+
+    >>> task = SweepTask(2014, 2016, 'NEW YORK', 'Lyme disease', ('temperature',))
+    """
+    train_year: int
+    test_year: int
+    region: str
+    disease: str
+    predictors: Tuple[str, ...]
+
+
+@dataclass
+class SweepResult:
+    """The fitted model of a SweepTask and how well it does.
+
+    Instance Attributes:
+      - task: the task this result belongs to
+      - intercept: the intercept of the fitted model
+      - coefficients: the coefficient of each predictor of the task, in the same order
+      - train_r_squared: the R squared value of the model on the training year
+      - test_r_squared: the R squared value of the model on the test year
+    """
+    task: SweepTask
+    intercept: float
+    coefficients: List[float]
+    train_r_squared: float
+    test_r_squared: float
+
+
+def make_grid(train_years: Sequence[int], test_years: Sequence[int], regions: Sequence[str],
+              diseases: Sequence[str],
+              predictor_sets: Sequence[Tuple[str, ...]]) -> List[SweepTask]:
+    """Return every combination of the given training years, test years, regions, diseases
+    and predictor sets as a list of tasks.
+
+    >>> len(make_grid([2014], [2016], ['NEW YORK'], ['Lyme disease', 'Malaria'],
+    ...               [('temperature',), ('precipitation',), ('temperature', 'precipitation')]))
+    6
+    """
+    return [SweepTask(*combination) for combination in
+            itertools.product(train_years, test_years, regions, diseases, predictor_sets)]
+
+
+def load_dataset(year: int, region: str, weather_path: str = WEATHER_PATH,
+                 disease_path: str = DISEASE_PATH) -> MonthlyTable:
+    """Return the monthly climate variables and disease cases of the given region in the
+    given year, joined into one table.
+
+    weather_path and disease_path are formatted with the year and region to find the files.
+    """
+    return load_datasets(weather_path.format(year=year, region=region),
+                         disease_path.format(year=year, region=region), [region])[0]
+
+
+def load_datasets(weather_file: str, disease_file: str,
+                  regions: Sequence[str]) -> List[MonthlyTable]:
+    """Return the monthly climate variables and disease cases of each given region of the
+    given files, joined into one table per region. Each file is read once.
+
+    Preconditions:
+        - every region in regions is a reporting area of disease_file
+    """
+    climate = load_weather_table(weather_file)
+    panel = load_disease_panel(disease_file)
+    return [climate.join(load_disease_panel_table(panel, region, list(panel.diseases)))
+            for region in regions]
+
+
+def fit_task(task: SweepTask, train: MonthlyTable, test: MonthlyTable) -> SweepResult:
+    """Fit the model described by task on the train table and evaluate it on the test table.
+
+    A single predictor is fitted with simple_linear_regression, and several predictors
+    with a multiple linear regression.
+    """
+    if len(task.predictors) == 1:
+        train_points = list(zip(train.column(task.predictors[0]).tolist(),
+                                train.column(task.disease).tolist()))
+        test_points = list(zip(test.column(task.predictors[0]).tolist(),
+                               test.column(task.disease).tolist()))
+        a, b = simple_linear_regression(train_points)
+        return SweepResult(task, a, [b], calculate_r_squared(train_points, a, b),
+                           calculate_r_squared(test_points, a, b))
+    else:
+        model = fit_multiple_regression(train.select(task.predictors),
+                                        train.column(task.disease), task.predictors)
+        return SweepResult(task, model.intercept, model.coefficients.tolist(), model.r_squared,
+                           r_squared(test.column(task.disease),
+                                     model.predict(test.select(task.predictors))))
+
+
+def r_squared(y: np.ndarray, y_hat: np.ndarray) -> float:
+    """Return the R squared value of the predictions y_hat of the observations y.
+
+    >>> r_squared(np.array([1.0, 2.0, 3.0]), np.array([1.0, 2.0, 3.0]))
+    1.0
+    """
+    return float(1 - np.sum((y - y_hat) ** 2) / np.sum((y - np.mean(y)) ** 2))
+
+
+def run_sweep(tasks: Sequence[SweepTask], weather_path: str = WEATHER_PATH,
+              disease_path: str = DISEASE_PATH,
+              max_workers: Optional[int] = None) -> List[SweepResult]:
+    """Run every task of the sweep on a pool of max_workers processes (by default, one per
+    core), and return their results in the same order as tasks.
+
+    Each pair of weather and disease files is read once, in parallel, and then the models
+    are fitted in parallel, in chunks of tasks so that the many small fits are not
+    dominated by sending each one to a process.
+    """
+    # The (year, region) datasets needed by the tasks, grouped by the files they are in
+    keys = dict.fromkeys((year, task.region) for task in tasks
+                         for year in (task.train_year, task.test_year))
+    files: Dict[Tuple[str, str], List[Tuple[int, str]]] = {}
+    for year, region in keys:
+        file_pair = (weather_path.format(year=year, region=region),
+                     disease_path.format(year=year, region=region))
+        list.append(files.setdefault(file_pair, []), (year, region))
+
+    workers = max_workers or os.cpu_count()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        tables = executor.map(load_datasets, [pair[0] for pair in files],
+                              [pair[1] for pair in files],
+                              [[region for _, region in group] for group in files.values()])
+        datasets: Dict[Tuple[int, str], MonthlyTable] = {}
+        for group, group_tables in zip(files.values(), tables):
+            datasets.update(zip(group, group_tables))
+
+        return list(executor.map(fit_task, tasks,
+                                 [datasets[(task.train_year, task.region)] for task in tasks],
+                                 [datasets[(task.test_year, task.region)] for task in tasks],
+                                 chunksize=max(1, len(tasks) // (CHUNKS_PER_WORKER * workers))))
+
+
+def write_results(results: Sequence[SweepResult], filepath: str) -> None:
+    """Write the given sweep results to a csv file at filepath, one row per result."""
+    with open(filepath, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['train_year', 'test_year', 'region', 'disease', 'predictors',
+                         'intercept', 'coefficients', 'train_r_squared', 'test_r_squared'])
+        for result in results:
+            task = result.task
+            writer.writerow([task.train_year, task.test_year, task.region, task.disease,
+                             ' '.join(task.predictors), result.intercept,
+                             ' '.join(str(coef) for coef in result.coefficients),
+                             result.train_r_squared, result.test_r_squared])
+
+
+if __name__ == '__main__':
+    import doctest
+
+    doctest.testmod(verbose=True)
+
+    import python_ta
+    python_ta.check_all(config={
+        'extra-imports': ['csv', 'itertools', 'os', 'concurrent.futures', 'dataclasses',
+                          'typing', 'numpy', 'data_class', 'read_data', 'simple_regression',
+                          'multiple_regression', 'python_ta'],
+        'allowed-io': ['write_results'],
+        'max-line-length': 100,
+        'disable': ['R1705', 'C0200']
+    })
@@ -0,0 +1,263 @@
+"""CSC110 final project, main module
+
+Descriptions
+===============================
+
+This module reads our weather and disease csv files column by column into typed NumPy
+arrays, instead of one row and one cell at a time.
+
+A file is read in one call and split into its columns with a few string operations on
+the whole file, without parsing each row. Each numeric column is then converted by NumPy
+in one call, with trace amounts 'T' and blank cells read as configurable values. Dates
+(day-month-year or YYYYMM) are parsed the same way, into integer day or month indices,
+by splitting their fields in bulk instead of building a datetime.date for every row.
+
+Copyright and Usage Information
+===============================
+
+All forms of distribution of this code, whether as given or with any changes, are
+expressly prohibited. All rights reserved.
+
+This file is Copyright (c) 2020 Runshi Yang, Chenxu Wang and Haojun Qiu
+"""
+import csv
+import io
+from typing import List, Tuple
+import numpy as np
+from data_class import ClimateTable, DiseasePanel
+from read_data import climate_variable_names, SUMMED_CLIMATE_VARIABLES
+
+# The values that trace amounts 'T' and blank (or missing 'M') cells are read as, by default
+TRACE_VALUE = 0.0
+BLANK_VALUE = float('nan')
+
+
+def read_columns(filepath: str) -> Tuple[List[str], List[List[str]]]:
+    """Return the header of the csv file at filepath, and the cells of each of its columns.
+
+    Files without quoted cells (beyond the header) are split with a few string operations
+    on the whole file, instead of parsing each row; other files fall back to the csv module.
+
+    Preconditions:
+        - every row of the file has as many cells as its header
+    """
+    with open(filepath, newline='') as file:
+        text = file.read()
+
+    header_line, _, body = text.partition('\n')
+    header = next(csv.reader([header_line.rstrip('\r')]))
+    body = body.replace('\r\n', '\n').rstrip('\n')
+    if body == '':
+        return (header, [[] for _ in header])
+
+    if '"' not in body:
+        # When every row has as many cells as the header, the cells of all rows can be
+        # split at once, and each column is every len(header)-th cell
+        lines = body.split('\n')
+        if {line.count(',') for line in lines} == {len(header) - 1}:
+            cells = body.replace('\n', ',').split(',')
+            return (header, [cells[j::len(header)] for j in range(len(header))])
+        rows = [str.split(line, ',') for line in lines]
+    else:
+        rows = list(csv.reader(io.StringIO(body)))
+
+    if any(len(row) != len(header) for row in rows):
+        raise ValueError(filepath + ' has rows with a different number of cells than its header')
+    return (header, [list(column) for column in zip(*rows)])
+
+
+def float_column(cells: List[str], trace: float = TRACE_VALUE,
+                 blank: float = BLANK_VALUE) -> np.ndarray:
+    """Return the given cells as floats, where trace amounts 'T' are read as trace and
+    blank or missing 'M' cells as blank. Whitespace around a cell is ignored.
+
+    >>> float_column(['1.5', 'T', '', '2', 'M'], blank=-1.0).tolist()
+    [1.5, 0.0, -1.0, 2.0, -1.0]
+    >>> float_column([' 1.5', ' T ', ' ', 'M '], blank=-1.0).tolist()
+    [1.5, 0.0, -1.0, -1.0]
+    """
+    try:
+        # Most columns only hold numbers, and are converted by NumPy in one call
+        return np.array(cells, dtype=np.float64)
+    except ValueError:
+        special = {'T': trace, '': blank, 'M': blank}
+        stripped = [str.strip(cell) for cell in cells]
+        return np.array([special.get(cell, cell) for cell in stripped], dtype=np.float64)
+
+
+def trace_mask(cells: List[str]) -> np.ndarray:
+    """Return which of the given cells are trace amounts 'T', ignoring whitespace around them.
+
+    >>> trace_mask(['0.1', 'T', '', ' T']).tolist()
+    [False, True, False, True]
+    """
+    return np.array([str.strip(cell) == 'T' for cell in cells], dtype=bool)
+
+
+def day_numbers(cells: List[str]) -> np.ndarray:
+    """Return the number of days from 1970-01-01 (as in NumPy's datetime64[D]) to each of
+    the given day-month-year dates.
+
+    The dates are parsed together: their fields are split and converted to integers in
+    bulk, and the day numbers computed with array arithmetic.
+
+    >>> day_numbers(['2-1-1970', '1-1-2016', '29-2-2016']).tolist()
+    [1, 16801, 16860]
+    >>> day_numbers(['30-2-2016'])
+    Traceback (most recent call last):
+    ValueError: 30-2-2016 is not a valid day-month-year date
+    """
+    if len(cells) == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    fields = np.array(str.split('-'.join(cells), '-'), dtype=np.int64)
+    if len(fields) != 3 * len(cells):
+        raise ValueError('some dates are not in day-month-year format')
+    day, month, year = fields.reshape(len(cells), 3).T
+
+    firsts = ((year - 1970) * 12 + month - 1).astype('datetime64[M]')
+    lengths = ((firsts + 1).astype('datetime64[D]') - firsts.astype('datetime64[D]')) \
+        .astype(np.int64)
+    invalid = (month < 1) | (month > 12) | (day < 1) | (day > lengths)
+    if invalid.any():
+        raise ValueError(cells[int(np.argmax(invalid))] + ' is not a valid day-month-year date')
+    return firsts.astype('datetime64[D]').astype(np.int64) + day - 1
+
+
+def yyyymm_month_indices(cells: List[str]) -> np.ndarray:
+    """Return the month_index of each of the given YYYYMM dates.
+
+    >>> yyyymm_month_indices(['201402', '201412']).tolist() == [2014 * 12 + 1, 2014 * 12 + 11]
+    True
+    """
+    dates = np.array(cells, dtype=np.int64)
+    month = dates % 100
+    if ((month < 1) | (month > 12)).any():
+        raise ValueError('some dates are not valid YYYYMM dates')
+    return dates // 100 * 12 + month - 1
+
+
+def month_indices(days: np.ndarray) -> np.ndarray:
+    """Return the month_index of each of the given day numbers.
+
+    >>> month_indices(np.array([0, 16801])).tolist() == [1970 * 12, 2016 * 12]
+    True
+    """
+    return days.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64) + 1970 * 12
+
+
+def monthly_climate_table(months: np.ndarray, names: List[str],
+                          values: np.ndarray) -> ClimateTable:
+    """Return the monthly values of the climate variables with the given names, given the
+    month_index of each daily row and the value of each variable on that day.
+
+    Precipitation and snow fall are summed over each month, and the other variables are
+    averaged over each month, adding each month's days in their given order so the results
+    are identical to read_data.climate_table_from_daily_rows.
+
+    >>> table = monthly_climate_table(np.array([5, 6, 5]), ['temperature', 'precipitation'],
+    ...                               np.array([[1.0, 1.0], [4.0, 2.0], [3.0, 3.0]]))
+    >>> table.months.tolist(), table.values.tolist()
+    ([5, 6], [[2.0, 4.0], [4.0, 2.0]])
+    """
+    if len(months) == 0:
+        return ClimateTable([], names, np.zeros((0, len(names))))
+
+    # Group the days by month, keeping their order within each month
+    order = np.argsort(months, kind='stable')
+    months = months[order]
+    firsts = np.concatenate(([0], np.flatnonzero(np.diff(months)) + 1))
+    counts = np.diff(np.append(firsts, len(months)))
+
+    # Lay the days out as (day of month, month, variable), padding short months with 0.0;
+    # summing over the first axis then adds the days of every month in order, so the
+    # totals are identical to those of MonthlyStats
+    month_of_day = np.repeat(np.arange(len(firsts)), counts)
+    daily = np.zeros((int(counts.max()), len(firsts), len(names)))
+    daily[np.arange(len(months)) - firsts[month_of_day], month_of_day] = values[order]
+    totals = sum(daily)
+
+    summed = np.array([name in SUMMED_CLIMATE_VARIABLES for name in names])
+    return ClimateTable(months[firsts], names,
+                        np.where(summed, totals, totals / counts[:, np.newaxis]))
+
+
+def read_daily_weather(filepath: str, trace: float = TRACE_VALUE, blank: float = BLANK_VALUE) \
+        -> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray]:
+    """Return the names of the climate variables of the daily weather file at filepath,
+    the day number of each row, the value of each variable in each row (one column per
+    variable), and which of those values were trace amounts 'T'.
+
+    Preconditions:
+        - filepath refers to a csv file in the format of datasets/weather_2016.csv
+    """
+    header, columns = read_columns(filepath)
+    names = climate_variable_names(header)
+    data = columns[1:1 + len(names)]
+    values = np.column_stack([float_column(cells, trace, blank) for cells in data]) \
+        .reshape(len(columns[0]), len(names))
+    is_trace = np.column_stack([trace_mask(cells) for cells in data]) \
+        .reshape(len(columns[0]), len(names))
+    return (names, day_numbers(columns[0]), values, is_trace)
+
+
+def read_weather_table(filepath: str, trace: float = TRACE_VALUE,
+                       blank: float = BLANK_VALUE) -> ClimateTable:
+    """Return the same table as read_data.load_weather_table(filepath), for a file with
+    either monthly or daily rows, reading trace amounts as trace and blank cells as blank.
+    """
+    header, columns = read_columns(filepath)
+    names = climate_variable_names(header)
+    dates = columns[0]
+    values = np.column_stack([float_column(cells, trace, blank)
+                              for cells in columns[1:1 + len(names)]]) \
+        .reshape(len(dates), len(names))
+
+    # Daily rows are dated day-month-year, monthly rows are dated YYYYMM
+    if len(dates) > 0 and '-' in dates[0]:
+        return monthly_climate_table(month_indices(day_numbers(dates)),
+                                     names, values)
+    else:
+        return ClimateTable(yyyymm_month_indices(dates), names, values)
+
+
+def read_disease_panel(filepath: str, missing: float = 0.0) -> DiseasePanel:
+    """Return the same panel as read_data.load_disease_panel(filepath, missing).
+
+    Preconditions:
+        - filepath refers to a csv file in the format of datasets/disease_2016.csv
+    """
+    header, columns = read_columns(filepath)
+
+    # Disease columns are named like 'Lyme disease, Current week'
+    diseases = [str.split(column, ',')[0] for column in header[3:]]
+    cases = np.column_stack([float_column(cells, missing, missing)
+                             for cells in columns[3:3 + len(diseases)]]) \
+        .reshape(len(columns[0]), len(diseases))
+
+    areas = sorted(set(columns[0]))
+    area_numbers = {area: i for i, area in enumerate(areas)}
+    area_positions = np.fromiter(map(area_numbers.__getitem__, columns[0]), dtype=np.int64,
+                                 count=len(columns[0]))
+    weeks, week_positions = np.unique(np.array(columns[1], dtype=np.int64) * 100
+                                      + np.array(columns[2], dtype=np.int64),
+                                      return_inverse=True)
+
+    panel = np.full((len(areas), len(diseases), len(weeks)), missing)
+    panel[area_positions, :, week_positions] = cases
+    return DiseasePanel(areas, diseases, [(week // 100, week % 100) for week in weeks.tolist()],
+                        panel)
+
+
+if __name__ == '__main__':
+    import doctest
+
+    doctest.testmod(verbose=True)
+
+    import python_ta
+    python_ta.check_all(config={
+        'extra-imports': ['csv', 'io', 'typing', 'numpy', 'data_class', 'read_data', 'python_ta'],
+        'allowed-io': ['read_columns'],
+        'max-line-length': 100,
+        'disable': ['R1705', 'C0200']
+    })
@@ -0,0 +1,238 @@
+"""CSC110 final project, main module
+
+Descriptions
+===============================
+
+This module converts daily weather csv files (in the format of datasets/weather_2016.csv)
+into a binary, column-oriented store that is read through a memory map.
+
+A store file holds a short header followed by fixed-width columns: the date of each day
+(as datetime64[D], sorted), one float64 column per weather variable, and one uint8 column
+per variable flagging the days reported as a trace amount 'T' (stored as 0.0). Blank or
+missing cells are stored as NaN.
+
+Opening a store only reads its header; slicing a date range finds its rows with a binary
+search over the dates and returns views into the memory map, so only the pages actually
+touched are ever read from disk.
+
+Copyright and Usage Information
+===============================
+
+All forms of distribution of this code, whether as given or with any changes, are
+expressly prohibited. All rights reserved.
+
+This file is Copyright (c) 2020 Runshi Yang, Chenxu Wang and Haojun Qiu
+"""
+import datetime
+import json
+import os
+import tempfile
+from typing import List, Optional
+import numpy as np
+import dataset_cache
+from data_class import ClimateTable
+from typed_csv import month_indices, monthly_climate_table, read_daily_weather
+
+# The first bytes of every store file, and the version of its layout
+MAGIC = b'CSC110WX'
+STORE_VERSION = 1
+
+# Columns start on a multiple of this many bytes, so every column is aligned
+ALIGNMENT = 64
+
+DateLike = Optional[datetime.date]
+
+
+def aligned(offset: int) -> int:
+    """Return the smallest multiple of ALIGNMENT that is at least offset.
+
+    >>> aligned(0), aligned(1), aligned(64)
+    (0, 64, 64)
+    """
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def convert_daily_weather(filepath: str, store_path: str) -> int:
+    """Convert the daily weather csv file at filepath into a store at store_path, and
+    return the number of days stored.
+
+    The store is written to a temporary file of its own first, so a reader never sees a
+    partly written store, and processes converting the same file at once never write
+    into each other's temporary file.
+
+    Preconditions:
+        - filepath refers to a csv file in the format of datasets/weather_2016.csv
+    """
+    names, day_numbers, values, trace = read_daily_weather(filepath)
+    order = np.argsort(day_numbers, kind='stable')
+    days = day_numbers[order].astype('datetime64[D]')
+    values = values[order]
+    trace = trace[order].astype(np.uint8)
+
+    header = json.dumps({'version': STORE_VERSION, 'rows': len(days), 'names': names})
+    header_bytes = header.encode('utf-8')
+
+    directory = os.path.dirname(store_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    handle, temp_path = tempfile.mkstemp(dir=directory or None, suffix='.tmp')
+    try:
+        with os.fdopen(handle, 'wb') as file:
+            file.write(MAGIC)
+            file.write(np.uint32(len(header_bytes)).tobytes())
+            file.write(header_bytes)
+
+            # Each column is written contiguously, starting on an aligned offset
+            for column in [days] + [values[:, j] for j in range(len(names))] \
+                    + [trace[:, j] for j in range(len(names))]:
+                file.write(b'\0' * (aligned(file.tell()) - file.tell()))
+                file.write(np.ascontiguousarray(column).tobytes())
+        os.replace(temp_path, store_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return len(days)
+
+
+class WeatherStore:
+    """A daily weather store, read through a memory map.
+
+    Instance Attributes:
+      - path: the path of the store file
+      - names: the name of each weather variable
+      - dates: the date of each day, in increasing order
+      - values: a memory-mapped float64 column for each weather variable
+      - trace: a memory-mapped uint8 column for each weather variable, which is 1 on the
+        days that variable was a trace amount
+
+    Representation Invariants:
+      - len(self.values) == len(self.trace) == len(self.names)
+      - all(len(column) == len(self.dates) for column in self.values)
+    """
+    __slots__ = ('path', 'names', 'dates', 'values', 'trace')
+    path: str
+    names: tuple
+    dates: np.ndarray
+    values: List[np.ndarray]
+    trace: List[np.ndarray]
+
+    def __init__(self, path: str) -> None:
+        with open(path, 'rb') as file:
+            if file.read(len(MAGIC)) != MAGIC:
+                raise ValueError(path + ' is not a weather store')
+            length = int(np.frombuffer(file.read(4), dtype=np.uint32)[0])
+            header = json.loads(file.read(length).decode('utf-8'))
+        if header['version'] != STORE_VERSION:
+            raise ValueError(path + ' has an unsupported store version')
+
+        self.path = path
+        self.names = tuple(header['names'])
+        rows = header['rows']
+
+        # Lay the columns out in the order convert_daily_weather wrote them
+        offset = aligned(len(MAGIC) + 4 + length)
+        columns = []
+        for dtype in ['datetime64[D]'] + ['float64'] * len(self.names) \
+                + ['uint8'] * len(self.names):
+            size = np.dtype(dtype).itemsize * rows
+            if size == 0:
+                list.append(columns, np.zeros(0, dtype=dtype))
+            else:
+                list.append(columns, np.memmap(path, dtype=dtype, mode='r', offset=offset,
+                                               shape=(rows,)))
+            offset = aligned(offset + size)
+
+        self.dates = columns[0]
+        self.values = columns[1:1 + len(self.names)]
+        self.trace = columns[1 + len(self.names):]
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def rows_between(self, start: DateLike = None, end: DateLike = None) -> slice:
+        """Return the slice of rows whose dates are between start and end (both inclusive).
+        A missing start or end leaves that side of the range open."""
+        low = 0 if start is None else int(np.searchsorted(self.dates, np.datetime64(start, 'D'),
+                                                          side='left'))
+        high = len(self.dates) if end is None else \
+            int(np.searchsorted(self.dates, np.datetime64(end, 'D'), side='right'))
+        return slice(low, high)
+
+    def column(self, name: str, start: DateLike = None, end: DateLike = None) -> np.ndarray:
+        """Return a read-only view of the given variable between start and end.
+
+        Preconditions:
+          - name in self.names
+        """
+        return self.values[self.names.index(name)][self.rows_between(start, end)]
+
+    def trace_days(self, name: str, start: DateLike = None, end: DateLike = None) -> np.ndarray:
+        """Return a boolean array of which days between start and end the given variable
+        was a trace amount.
+
+        Preconditions:
+          - name in self.names
+        """
+        return self.trace[self.names.index(name)][self.rows_between(start, end)] != 0
+
+    def monthly_table(self, start: DateLike = None, end: DateLike = None) -> ClimateTable:
+        """Return the monthly values of every weather variable between start and end,
+        aggregated as read_data.climate_table_from_daily_rows does: precipitation and
+        snow fall are summed over each month, and the other variables are averaged.
+        """
+        rows = self.rows_between(start, end)
+        return monthly_climate_table(month_indices(self.dates[rows].astype(np.int64)),
+                                     list(self.names),
+                                     np.column_stack([column[rows] for column in self.values]))
+
+
+def store_path(filepath: str, cache_dir: str = dataset_cache.CACHE_DIR) -> str:
+    """Return the path of the store converted from the given csv file, in the dataset
+    cache. The path changes whenever the csv file changes."""
+    return os.path.join(cache_dir, dataset_cache.fingerprint(filepath, 'weather store') + '.wx')
+
+
+def open_weather_store(filepath: str, cache_dir: str = dataset_cache.CACHE_DIR,
+                       max_bytes: int = dataset_cache.MAX_CACHE_BYTES) -> WeatherStore:
+    """Return the store of the given daily weather csv file, converting the file first if it
+    has not been converted since it last changed.
+
+    Converting a file evicts older cache entries down to max_bytes, but never the new
+    store itself, even when it is larger than max_bytes on its own.
+
+    Preconditions:
+        - filepath refers to a csv file in the format of datasets/weather_2016.csv
+
+    >>> import tempfile
+    >>> store = open_weather_store('datasets/weather_2016.csv', tempfile.mkdtemp(), max_bytes=1)
+    >>> len(store)
+    366
+    """
+    path = store_path(filepath, cache_dir)
+    try:
+        # Mark this entry as recently used
+        os.utime(path)
+        return WeatherStore(path)
+    except FileNotFoundError:
+        # Not converted yet, or evicted by another process while it was being opened
+        pass
+
+    convert_daily_weather(filepath, path)
+    dataset_cache.evict(cache_dir, max_bytes, keep=path)
+    return WeatherStore(path)
+
+
+if __name__ == '__main__':
+    import doctest
+
+    doctest.testmod(verbose=True)
+
+    import python_ta
+    python_ta.check_all(config={
+        'extra-imports': ['datetime', 'json', 'os', 'tempfile', 'typing', 'numpy',
+                          'dataset_cache', 'data_class', 'typed_csv', 'python_ta'],
+        'allowed-io': ['convert_daily_weather', 'WeatherStore.__init__'],
+        'max-line-length': 100,
+        'disable': ['R1705', 'C0200']
+    })